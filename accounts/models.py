@@ -1,4 +1,8 @@
+from datetime import timedelta
+
 from django.db import models
+from django.db.models import Case, F, Value, When
+from django.db.models.functions import Greatest
 from django.contrib.auth.models import AbstractUser
 from django.utils import timezone
 
@@ -111,6 +115,39 @@ class UserProfile(models.Model):
         
         self.last_activity_date = today
         self.save()
+    
+    @classmethod
+    def record_activity(cls, user, xp=0, **counters):
+        """
+        Award XP, bump the streak and add to stat counters in one UPDATE.
+        
+        Does the work of add_xp() and update_streak() without loading the
+        row, so concurrent calls cannot overwrite each other.
+        
+        Args:
+            user: Profile owner
+            xp: XP points to add
+            **counters: Amounts to add to counter fields, e.g.
+                total_quizzes_taken=1
+        """
+        today = timezone.now().date()
+        streak = Case(
+            When(last_activity_date=today, then=F('streak_days')),
+            When(last_activity_date=today - timedelta(days=1), then=F('streak_days') + 1),
+            default=Value(1),
+        )
+        updates = {name: F(name) + amount for name, amount in counters.items()}
+        cls.objects.filter(user=user).update(
+            xp_points=F('xp_points') + xp,
+            # Level up every 1000 XP
+            level=Greatest(F('level'), (F('xp_points') + xp) / 1000 + 1),
+            streak_days=streak,
+            longest_streak=Greatest(F('longest_streak'), streak),
+            last_activity_date=today,
+            # update() skips auto_now
+            updated_at=timezone.now(),
+            **updates,
+        )
 
 
 # Signal to create profile when user is created
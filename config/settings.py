@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
+import sys
 from pathlib import Path
 from decouple import config, UndefinedValueError
 
@@ -51,6 +52,8 @@ MIDDLEWARE = [
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
+    # Before CSRF, which would otherwise read the full upload body
+    'learning_assistant.middleware.RequestSizeLimitMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
@@ -88,6 +91,12 @@ DATABASES = {
         'PASSWORD': config('DB_PASSWORD', default=''),
         'HOST': config('DB_HOST', default='localhost'),
         'PORT': config('DB_PORT', default='5432'),
+        # Reuse connections across requests instead of reconnecting each time;
+        # set to 0 behind a transaction-pooling pgbouncer
+        'CONN_MAX_AGE': config('DB_CONN_MAX_AGE', default=60, cast=int),
+        'CONN_HEALTH_CHECKS': True,
+        # Transaction pooling also needs server-side cursors (iterator()) off
+        'DISABLE_SERVER_SIDE_CURSORS': config('DB_DISABLE_SERVER_SIDE_CURSORS', default=False, cast=bool),
     }
 }
 
@@ -152,10 +161,87 @@ except UndefinedValueError:
     import warnings
     warnings.warn("GEMINI_API_KEY not set. AI features will not work.")
 
+# Documents longer than this many tokens are summarized map-reduce style
+SUMMARY_MAX_CONTEXT_TOKENS = config('SUMMARY_MAX_CONTEXT_TOKENS', default=100_000, cast=int)
+# Tokens of document text sent for quizzes, flashcards, flowcharts and podcasts
+GENERATION_CONTEXT_TOKENS = config('GENERATION_CONTEXT_TOKENS', default=2500, cast=int)
+# Summaries streamed at once per web process; further requests run as background jobs
+SUMMARY_STREAM_SLOTS = config('SUMMARY_STREAM_SLOTS', default=4, cast=int)
+
+# OCR Configuration
+# Load the EasyOCR model at startup (pair with `gunicorn --preload` so workers share it)
+OCR_PREWARM = config('OCR_PREWARM', default=False, cast=bool)
+# Wrap the OCR networks in torch.compile (bf16 autocast on AVX512_BF16 CPUs)
+OCR_TORCH_COMPILE = config('OCR_TORCH_COMPILE', default=False, cast=bool)
+
+# Background Jobs
+# Threads per web worker running AI generation outside the request cycle
+GENERATION_JOB_WORKERS = config('GENERATION_JOB_WORKERS', default=4, cast=int)
+# Seconds a job may stay pending, or run without a heartbeat, before polls fail it
+GENERATION_JOB_TIMEOUT = config('GENERATION_JOB_TIMEOUT', default=15 * 60, cast=int)
+# Seconds a generated result is reused for identical context and options
+RESPONSE_CACHE_TIMEOUT = config('RESPONSE_CACHE_TIMEOUT', default=24 * 60 * 60, cast=int)
+
+# Logging
+# Errors go to the console; set LOG_FILE to also write a rotating log file.
+# Records are handed to a queue and written by a background thread
+# (started in LearningAssistantConfig.ready), so requests never wait on I/O.
+LOG_LEVEL = config('LOG_LEVEL', default='INFO')
+LOG_FILE = config('LOG_FILE', default='')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'structured': {
+            'format': 'time=%(asctime)s level=%(levelname)s logger=%(name)s '
+                      'thread=%(threadName)s msg=%(message)s',
+        },
+    },
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+            'formatter': 'structured',
+        },
+    },
+    'loggers': {
+        'learning_assistant': {
+            'handlers': ['console'],
+            'level': LOG_LEVEL,
+        },
+    },
+}
+
+if LOG_FILE:
+    LOGGING['handlers']['file'] = {
+        'class': 'logging.handlers.RotatingFileHandler',
+        'filename': LOG_FILE,
+        'maxBytes': 10 * 1024 * 1024,
+        'backupCount': 5,
+        'formatter': 'structured',
+    }
+    LOGGING['loggers']['learning_assistant']['handlers'].append('file')
+
+# dictConfig can build a QueueHandler's listener from Python 3.12
+if sys.version_info >= (3, 12):
+    LOGGING['handlers']['queue'] = {
+        'class': 'logging.handlers.QueueHandler',
+        'handlers': LOGGING['loggers']['learning_assistant']['handlers'],
+        'respect_handler_level': True,
+    }
+    LOGGING['loggers']['learning_assistant']['handlers'] = ['queue']
+
 # Vector Store Configuration
 VECTOR_STORE_DIR = BASE_DIR / 'vector_store'
 
 # File Upload Settings
 MAX_UPLOAD_SIZE = 10 * 1024 * 1024  # 10 MB
+# JSON API bodies carry a few ids and options
+MAX_JSON_BODY_SIZE = 64 * 1024  # 64 KB
 ALLOWED_UPLOAD_EXTENSIONS = ['.pdf', '.docx', '.txt', '.md', '.png', '.jpg', '.jpeg']
+# Always spool uploads to a temp file so they can be read from disk and
+# moved into MEDIA_ROOT without another in-memory copy
+FILE_UPLOAD_HANDLERS = [
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
 
@@ -7,18 +7,19 @@ that inherits from a common base class sharing the Gemini API client.
 
 Architecture:
 - BaseAgent: Shared Gemini client and common functionality
+- StreamingAgent: BaseAgent for free-text output that can be streamed
 - AgentRegistry: Central registry for managing and accessing agents
 - Individual agents: SummaryAgent, QuizAgent, FlashcardAgent, FlowchartAgent, EvaluationAgent
 
 Adding a new agent:
 1. Create a new file in this directory (e.g., my_agent.py)
-2. Inherit from BaseAgent
+2. Inherit from BaseAgent (StreamingAgent if it also implements generate_stream())
 3. Define AGENT_NAME and AGENT_DESCRIPTION
 4. Implement the generate() method
 5. Import the agent in this __init__.py file to register it
 """
 
-from .base import BaseAgent, get_gemini_client
+from .base import BaseAgent, StreamingAgent, get_gemini_client
 from .registry import AgentRegistry, get_agent
 
 # Import agents to trigger registration via @AgentRegistry.register decorator
@@ -32,6 +33,7 @@ from .chatbot_agent import ChatbotAgent
 
 __all__ = [
     'BaseAgent',
+    'StreamingAgent',
     'AgentRegistry',
     'get_agent',
     'get_gemini_client',
@@ -5,20 +5,30 @@ Contains the BaseAgent class that all AI agents inherit from.
 Provides shared access to the Gemini API client and common utilities.
 """
 
+import datetime
+import re
 import google.generativeai as genai
 from django.conf import settings
 from abc import ABC, abstractmethod
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, Iterator, List, Tuple
 
 
 # Singleton Gemini client instance
 _gemini_client = None
 
+# A word, for word counts: any run of non-whitespace
+_WORD_RE = re.compile(r'\S+')
+
 
 def get_gemini_client():
     """
     Get or create the shared Gemini client instance.
     This ensures all agents share the same API connection.
+    
+    The SDK's default gRPC transport keeps one long-lived HTTP/2 channel
+    per process, so the TLS handshake is paid once and later requests are
+    multiplexed over it. Keep that default: transport='rest' opens plain
+    HTTP/1.1 requests and has no async support.
     """
     global _gemini_client
     
@@ -60,6 +70,11 @@ class BaseAgent(ABC):
     DEFAULT_TEMPERATURE = 0.7
     DEFAULT_MAX_TOKENS = 8192
     
+    # Gemini context caching: contexts shorter than the API minimum
+    # (~1024 tokens, roughly 4 chars per token) are sent inline instead
+    CONTEXT_CACHE_TTL = datetime.timedelta(hours=1)
+    CONTEXT_CACHE_MIN_CHARS = 4096
+    
     def __init__(
         self,
         model_name: Optional[str] = None,
@@ -79,15 +94,20 @@ class BaseAgent(ABC):
         self.temperature = temperature if temperature is not None else self.DEFAULT_TEMPERATURE
         self.max_tokens = max_tokens or self.DEFAULT_MAX_TOKENS
         
+        self.generation_config = genai.GenerationConfig(
+            temperature=self.temperature,
+            max_output_tokens=self.max_tokens,
+        )
+        
         # Create the model instance with configuration
         self.model = self.client.GenerativeModel(
             model_name=self.model_name,
-            generation_config=genai.GenerationConfig(
-                temperature=self.temperature,
-                max_output_tokens=self.max_tokens,
-            ),
+            generation_config=self.generation_config,
             system_instruction=self.system_prompt,
         )
+        
+        # Models bound to Gemini cached contents, keyed by cache name
+        self._cached_models: Dict[str, Any] = {}
     
     @property
     @abstractmethod
@@ -137,19 +157,90 @@ class BaseAgent(ABC):
         
         return "\n".join(prompt_parts)
     
-    async def _generate_content(self, prompt: str) -> str:
+    def create_context_cache(self, context: str) -> Optional[Tuple[str, datetime.datetime]]:
+        """
+        Upload the system prompt and context as a Gemini cached content.
+        
+        Later calls pass the cache name as cached_content and send only
+        their request-specific instructions, so the document is not billed
+        as input tokens again.
+        
+        Args:
+            context: The document/content context to cache
+            
+        Returns:
+            (cache name, expiry time), or None if the context is too short
+            to be cached
+        """
+        if len(context) < self.CONTEXT_CACHE_MIN_CHARS:
+            return None
+        
+        from google.generativeai import caching
+        
+        cache = caching.CachedContent.create(
+            model=self.model_name,
+            system_instruction=self.system_prompt,
+            contents=[self._create_prompt(context)],
+            ttl=self.CONTEXT_CACHE_TTL,
+        )
+        return cache.name, cache.expire_time
+    
+    def count_tokens(self, text: str) -> int:
+        """Count the tokens Gemini would bill for text sent to this model."""
+        return self.model.count_tokens(text).total_tokens
+    
+    @staticmethod
+    def count_words(text: str) -> int:
+        """Count whitespace-separated words without building a list of them."""
+        return sum(1 for _ in _WORD_RE.finditer(text))
+    
+    def _get_cached_model(self, cached_content: str):
+        """Get a model instance that reads its prefix from a cached content."""
+        model = self._cached_models.get(cached_content)
+        if model is None:
+            model = self.client.GenerativeModel.from_cached_content(
+                cached_content,
+                generation_config=self.generation_config,
+            )
+            if len(self._cached_models) >= 64:
+                # Cache names expire with their TTL; drop stale bindings
+                self._cached_models.clear()
+            self._cached_models[cached_content] = model
+        return model
+    
+    async def _generate_content(self, prompt: str, cached_content: Optional[str] = None) -> str:
         """
         Generate content using the Gemini model.
         
         Args:
             prompt: The formatted prompt
+            cached_content: Optional Gemini cache name holding the system
+                prompt and context; prompt then carries only the request
             
         Returns:
             Generated text response
         """
-        response = await self.model.generate_content_async(prompt)
+        model = self._get_cached_model(cached_content) if cached_content else self.model
+        response = await model.generate_content_async(prompt)
         return response.text
     
+    def _stream_content(self, prompt: str, cached_content: Optional[str] = None) -> Iterator[str]:
+        """
+        Stream content from the Gemini model as it is generated.
+        
+        Args:
+            prompt: The formatted prompt
+            cached_content: Optional Gemini cache name, as for _generate_content
+            
+        Yields:
+            Text deltas, in order
+        """
+        model = self._get_cached_model(cached_content) if cached_content else self.model
+        for chunk in model.generate_content(prompt, stream=True):
+            # The closing chunk may carry only the finish reason
+            if chunk.parts:
+                yield chunk.text
+    
     def generate_sync(self, context: str, **kwargs) -> Dict[str, Any]:
         """
         Synchronous version of generate for use in Django views.
@@ -161,6 +252,11 @@ class BaseAgent(ABC):
         Returns:
             Dictionary containing the generated output and metadata
         """
+        return self._run_sync(self.generate(context, **kwargs))
+    
+    @staticmethod
+    def _run_sync(coro):
+        """Run a coroutine to completion on this thread's event loop."""
         import asyncio
         
         # Get or create event loop
@@ -170,7 +266,30 @@ class BaseAgent(ABC):
             loop = asyncio.new_event_loop()
             asyncio.set_event_loop(loop)
         
-        return loop.run_until_complete(self.generate(context, **kwargs))
+        return loop.run_until_complete(coro)
     
     def __repr__(self) -> str:
         return f"<{self.__class__.__name__}(model={self.model_name})>"
+
+
+class StreamingAgent(BaseAgent):
+    """
+    Base class for agents whose output is free text that can be streamed.
+    
+    Agents returning parsed JSON inherit from BaseAgent directly, since
+    their output is not usable until it is complete.
+    """
+    
+    @abstractmethod
+    def generate_stream(self, context: str, **kwargs) -> Iterator[str]:
+        """
+        Stream the generated text instead of returning it in one piece.
+        
+        Args:
+            context: The relevant content/context for generation
+            **kwargs: The same parameters as generate()
+            
+        Yields:
+            Text deltas, in order
+        """
+        pass
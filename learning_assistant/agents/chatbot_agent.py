@@ -7,13 +7,13 @@ and the chatbot answers strictly from the document context.
 If a question is unrelated, it politely declines.
 """
 
-from typing import Dict, Any, Optional, List
-from .base import BaseAgent
+from typing import Dict, Any, Iterator, Optional, List
+from .base import StreamingAgent
 from .registry import AgentRegistry
 
 
 @AgentRegistry.register
-class ChatbotAgent(BaseAgent):
+class ChatbotAgent(StreamingAgent):
     """
     AI agent for conversational document Q&A (RAG chatbot).
     
@@ -83,6 +83,50 @@ class ChatbotAgent(BaseAgent):
         Returns:
             Dictionary with 'response', 'sources_used', and 'success' keys
         """
+        full_prompt = self._build_prompt(context, user_message, chat_history)
+        
+        try:
+            # Generate the assistant's response using Gemini
+            response = await self._generate_content(full_prompt)
+            
+            return {
+                "response": response,
+                "sources_used": self.detect_sources_used(context, response),
+                "success": True,
+            }
+            
+        except Exception as e:
+            return {
+                "response": "I'm sorry, I encountered an error processing your question. Please try again.",
+                "sources_used": False,
+                "success": False,
+                "error": str(e),
+            }
+    
+    def generate_stream(
+        self,
+        context: str,
+        user_message: str = "",
+        chat_history: Optional[List[Dict[str, str]]] = None,
+        **kwargs
+    ) -> Iterator[str]:
+        """
+        Stream a chatbot response as it is generated.
+        
+        Takes the same arguments as generate(); the deltas joined together
+        are the response text. Pass the result to detect_sources_used() for
+        the 'sources_used' flag.
+        """
+        prompt = self._build_prompt(context, user_message, chat_history)
+        yield from self._stream_content(prompt)
+    
+    def _build_prompt(
+        self,
+        context: str,
+        user_message: str,
+        chat_history: Optional[List[Dict[str, str]]],
+    ) -> str:
+        """Build the chat prompt for generate() and generate_stream()."""
         # Build the full prompt with context, history, and current question
         prompt_parts = []
         
@@ -108,36 +152,21 @@ class ChatbotAgent(BaseAgent):
         prompt_parts.append(user_message)
         
         # Join all prompt parts into the final prompt string
-        full_prompt = "\n".join(prompt_parts)
-        
-        try:
-            # Generate the assistant's response using Gemini
-            response = await self._generate_content(full_prompt)
-            
-            # Determine if document context was actually used in the response
-            # (i.e., the context was not empty and the response doesn't decline)
-            decline_phrases = [
-                "couldn't find information",
-                "outside the scope",
-                "not related to",
-                "not covered in",
-                "not mentioned in",
-                "no relevant content found",
-            ]
-            sources_used = bool(context) and not any(
-                phrase in response.lower() for phrase in decline_phrases
-            )
-            
-            return {
-                "response": response,
-                "sources_used": sources_used,
-                "success": True,
-            }
-            
-        except Exception as e:
-            return {
-                "response": "I'm sorry, I encountered an error processing your question. Please try again.",
-                "sources_used": False,
-                "success": False,
-                "error": str(e),
-            }
+        return "\n".join(prompt_parts)
+    
+    @staticmethod
+    def detect_sources_used(context: str, response: str) -> bool:
+        """
+        Determine if document context was actually used in the response
+        (i.e., the context was not empty and the response doesn't decline).
+        """
+        decline_phrases = [
+            "couldn't find information",
+            "outside the scope",
+            "not related to",
+            "not covered in",
+            "not mentioned in",
+            "no relevant content found",
+        ]
+        lowered = response.lower()
+        return bool(context) and not any(phrase in lowered for phrase in decline_phrases)
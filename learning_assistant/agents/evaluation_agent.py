@@ -7,11 +7,15 @@ and provide percentage-based scoring with detailed feedback.
 
 import json
 import base64
+import logging
 from pathlib import Path
 from .base import BaseAgent
 from .registry import AgentRegistry
 
 
+logger = logging.getLogger(__name__)
+
+
 @AgentRegistry.register
 class EvaluationAgent(BaseAgent):
     """Agent for evaluating handwritten answer sheets using Gemini Vision."""
@@ -226,8 +230,7 @@ Analyze the answer sheet image now and provide your evaluation."""
             }
             
         except Exception as e:
-            import traceback
-            print(traceback.format_exc())
+            logger.exception('Answer sheet evaluation failed')
             return {
                 'success': False,
                 'error': str(e)
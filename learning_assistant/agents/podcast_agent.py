@@ -122,7 +122,7 @@ ALEX: We're going to explore [topic]. Let me start with the basics...
         return {
             "script": script,
             "level": level,
-            "word_count": len(script.split()),
+            "word_count": self.count_words(script),
             "success": True,
         }
     
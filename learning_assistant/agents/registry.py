@@ -6,6 +6,7 @@ Agents are automatically registered when their modules are imported.
 This allows seamless addition of new agents without modifying existing code.
 """
 
+import threading
 from typing import Dict, Type, Optional
 from .base import BaseAgent
 
@@ -27,6 +28,8 @@ class AgentRegistry:
     
     _agents: Dict[str, Type[BaseAgent]] = {}
     _instances: Dict[str, BaseAgent] = {}
+    # Background job threads may ask for the same agent at once
+    _instances_lock = threading.Lock()
     
     @classmethod
     def register(cls, agent_class: Type[BaseAgent]) -> Type[BaseAgent]:
@@ -52,7 +55,8 @@ class AgentRegistry:
     def get(cls, agent_name: str, **kwargs) -> BaseAgent:
         """
         Get an agent instance by name.
-        Creates a new instance or returns cached one.
+        Creates a new instance or returns cached one; each configuration
+        is constructed once per process, even under concurrent calls.
         
         Args:
             agent_name: Name of the agent to retrieve
@@ -76,10 +80,15 @@ class AgentRegistry:
         # Create new instance if kwargs provided or not cached
         cache_key = f"{agent_name}_{hash(frozenset(kwargs.items()))}" if kwargs else agent_name
         
-        if cache_key not in cls._instances:
-            cls._instances[cache_key] = cls._agents[agent_name](**kwargs)
+        agent = cls._instances.get(cache_key)
+        if agent is None:
+            with cls._instances_lock:
+                agent = cls._instances.get(cache_key)
+                if agent is None:
+                    agent = cls._agents[agent_name](**kwargs)
+                    cls._instances[cache_key] = agent
         
-        return cls._instances[cache_key]
+        return agent
     
     @classmethod
     def list_agents(cls) -> Dict[str, str]:
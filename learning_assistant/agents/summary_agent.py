@@ -6,13 +6,14 @@ Uses RAG (Retrieval-Augmented Generation) to create accurate,
 material-aligned summaries.
 """
 
-from typing import Dict, Any, Optional
-from .base import BaseAgent
+import asyncio
+from typing import Dict, Any, Iterator, List, Optional
+from .base import StreamingAgent
 from .registry import AgentRegistry
 
 
 @AgentRegistry.register
-class SummaryAgent(BaseAgent):
+class SummaryAgent(StreamingAgent):
     """
     AI agent specialized in creating educational summaries.
     
@@ -29,6 +30,23 @@ class SummaryAgent(BaseAgent):
     # Lower temperature for more focused, accurate summaries
     DEFAULT_TEMPERATURE = 0.5
     
+    # Map-reduce settings for documents over the context budget
+    MAP_CHUNK_TOKENS = 30_000
+    MAP_CONCURRENCY = 8
+    
+    # Instruction for each summary type; unknown types fall back to detailed
+    TYPE_INSTRUCTIONS = {
+        "brief": "Create a brief summary (150-250 words) capturing the essential points.",
+        "detailed": "Create a comprehensive summary covering all major topics and subtopics.",
+        "bullet": "Create a bullet-point summary with hierarchical organization.",
+    }
+    
+    # Request block for each type, built once; cached-context calls send only this
+    REQUEST_BLOCKS = {
+        summary_type: f"## User Request\n{instruction}"
+        for summary_type, instruction in TYPE_INSTRUCTIONS.items()
+    }
+    
     @property
     def system_prompt(self) -> str:
         return """You are an expert educational content summarizer designed to help students learn effectively. Your role is to create clear, comprehensive, and accurate summaries that make complex topics easy to understand.
@@ -74,6 +92,7 @@ Adapt your language complexity based on the apparent level of the source materia
         context: str, 
         summary_type: str = "detailed",
         focus_areas: Optional[list] = None,
+        cached_content: Optional[str] = None,
         **kwargs
     ) -> Dict[str, Any]:
         """
@@ -83,35 +102,126 @@ Adapt your language complexity based on the apparent level of the source materia
             context: The document content to summarize
             summary_type: Type of summary - 'brief', 'detailed', or 'bullet'
             focus_areas: Optional list of specific topics to focus on
+            cached_content: Optional Gemini cache name (see
+                create_context_cache) already holding this context
             
         Returns:
             Dictionary with 'summary', 'type', and 'word_count'
         """
-        # Build the prompt based on summary type
-        type_instructions = {
-            "brief": "Create a brief summary (150-250 words) capturing the essential points.",
-            "detailed": "Create a comprehensive summary covering all major topics and subtopics.",
-            "bullet": "Create a bullet-point summary with hierarchical organization.",
+        prompt = self._build_prompt(context, summary_type, focus_areas, cached_content)
+        
+        # Generate the summary
+        summary = await self._generate_content(prompt, cached_content=cached_content)
+        
+        return {
+            "summary": summary,
+            "type": summary_type,
+            "word_count": self.count_words(summary),
+            "success": True,
         }
+    
+    def generate_stream(
+        self,
+        context: str,
+        summary_type: str = "detailed",
+        focus_areas: Optional[list] = None,
+        cached_content: Optional[str] = None,
+        **kwargs
+    ) -> Iterator[str]:
+        """
+        Stream a summary of the provided context as it is generated.
         
-        instruction = type_instructions.get(summary_type, type_instructions["detailed"])
+        Takes the same arguments as generate(); the deltas joined together
+        are the summary text.
+        """
+        prompt = self._build_prompt(context, summary_type, focus_areas, cached_content)
+        yield from self._stream_content(prompt, cached_content=cached_content)
+    
+    def _build_prompt(
+        self,
+        context: str,
+        summary_type: str,
+        focus_areas: Optional[list],
+        cached_content: Optional[str],
+    ) -> str:
+        """Build the summary prompt for generate() and generate_stream()."""
+        request_block = self.REQUEST_BLOCKS.get(summary_type, self.REQUEST_BLOCKS["detailed"])
         
         # Add focus areas if specified
         if focus_areas:
             focus_str = ", ".join(focus_areas)
-            instruction += f"\n\nPay special attention to these areas: {focus_str}"
+            request_block += f"\n\nPay special attention to these areas: {focus_str}"
         
-        prompt = self._create_prompt(context, instruction)
+        if cached_content:
+            # The context is already in the cached prefix; send only the request
+            return request_block
+        # Same layout as _create_prompt(context, instruction)
+        return f"## Content to Process\n{context}\n\n{request_block}"
+    
+    async def generate_map_reduce_async(
+        self,
+        context: str,
+        summary_type: str = "detailed",
+        total_tokens: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """
+        Summarize a long document in parts, then merge the partial summaries.
         
-        # Generate the summary
-        summary = await self._generate_content(prompt)
+        The part summaries are requested concurrently on one event loop,
+        so wall time is roughly that of the slowest part plus the merge.
         
-        return {
-            "summary": summary,
-            "type": summary_type,
-            "word_count": len(summary.split()),
-            "success": True,
-        }
+        Args:
+            context: The full document content
+            summary_type: Type of the final summary
+            total_tokens: Token count of context, if already known
+            
+        Returns:
+            Same structure as generate()
+        """
+        total_tokens = total_tokens or self.count_tokens(context)
+        chars_per_token = len(context) / max(total_tokens, 1)
+        parts = self._split_parts(context, int(self.MAP_CHUNK_TOKENS * chars_per_token))
+        
+        # Map: summarize each part concurrently, capped to stay under rate limits
+        semaphore = asyncio.Semaphore(self.MAP_CONCURRENCY)
+        
+        async def summarize_part(part: str) -> Dict[str, Any]:
+            async with semaphore:
+                return await self.generate(part, summary_type="detailed")
+        
+        partials = await asyncio.gather(*(summarize_part(part) for part in parts))
+        
+        # Reduce: one summary of the partial summaries
+        combined = "\n\n".join(
+            f"### Part {i} of {len(partials)}\n{partial['summary']}"
+            for i, partial in enumerate(partials, 1)
+        )
+        return await self.generate(
+            "The following are summaries of consecutive parts of a single "
+            "document. Combine them into one summary of the whole document.\n\n"
+            + combined,
+            summary_type=summary_type,
+        )
+    
+    def generate_map_reduce(self, context: str, **kwargs) -> Dict[str, Any]:
+        """Synchronous version of generate_map_reduce_async."""
+        return self._run_sync(self.generate_map_reduce_async(context, **kwargs))
+    
+    @staticmethod
+    def _split_parts(text: str, max_chars: int) -> List[str]:
+        """Split text into parts of at most max_chars, preferring paragraph breaks."""
+        parts = []
+        start = 0
+        while start < len(text):
+            end = min(start + max_chars, len(text))
+            if end < len(text):
+                # Back up to the last paragraph break in the second half
+                br = text.rfind("\n\n", start + max_chars // 2, end)
+                if br != -1:
+                    end = br
+            parts.append(text[start:end])
+            start = end
+        return parts
     
     def generate_brief(self, context: str, **kwargs) -> Dict[str, Any]:
         """Convenience method for brief summaries."""
@@ -1,5 +1,57 @@
+import atexit
+import logging
+import os
+from logging.handlers import QueueHandler
+
 from django.apps import AppConfig
+from django.conf import settings
+
+
+def _queue_listeners():
+    """QueueListeners configured for the app's logger (see LOGGING)."""
+    for handler in logging.getLogger('learning_assistant').handlers:
+        listener = getattr(handler, 'listener', None)
+        if isinstance(handler, QueueHandler) and listener:
+            yield listener
+
+
+def _start_log_listeners():
+    """Start the threads that write queued log records."""
+    for listener in _queue_listeners():
+        if listener._thread is None:
+            listener.start()
+
+
+def _restart_log_listeners_in_child():
+    """Give a forked worker its own writer threads."""
+    for listener in _queue_listeners():
+        # Records queued before the fork belong to the parent's thread,
+        # and the thread inherited across fork is not running
+        while not listener.queue.empty():
+            listener.queue.get_nowait()
+        listener._thread = None
+        listener.start()
+
+
+def _stop_log_listeners():
+    """Flush queued log records at exit."""
+    for listener in _queue_listeners():
+        if listener._thread:
+            listener.stop()
 
 
 class LearningAssistantConfig(AppConfig):
     name = 'learning_assistant'
+
+    def ready(self):
+        _start_log_listeners()
+        atexit.register(_stop_log_listeners)
+        # Forked workers (gunicorn --preload) need their own writer thread
+        os.register_at_fork(after_in_child=_restart_log_listeners_in_child)
+        
+        # Load the EasyOCR weights once at startup. With `gunicorn --preload`
+        # this runs in the master process, so forked workers share them;
+        # warmup() runs no inference, which would not survive the fork.
+        if getattr(settings, 'OCR_PREWARM', False):
+            from .services.ocr_service import ocr_service
+            ocr_service.warmup()
@@ -0,0 +1,68 @@
+"""
+Learning Assistant Middleware
+"""
+
+from django.conf import settings
+from django.http import JsonResponse
+
+
+# Allowance for the multipart boundaries and small form fields (title, token)
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+def max_json_body_size(max_size: int):
+    """
+    Raise the MAX_JSON_BODY_SIZE cap for one view, e.g. one posting
+    document text rather than ids and options.
+    """
+    def decorator(view_func):
+        view_func.max_json_body_size = max_size
+        return view_func
+    return decorator
+
+
+def _content_length(request) -> int:
+    """Content-Length of a request, or 0 if missing or invalid."""
+    try:
+        return int(request.META.get('CONTENT_LENGTH') or 0)
+    except ValueError:
+        return 0
+
+
+class RequestSizeLimitMiddleware:
+    """
+    Reject oversized uploads and JSON bodies from the Content-Length header.
+
+    Multipart uploads are capped at MAX_UPLOAD_SIZE. JSON API bodies, which
+    carry a few ids and options, are capped at MAX_JSON_BODY_SIZE unless
+    the view raises it with @max_json_body_size.
+
+    Must run before CsrfViewMiddleware, which reads request.POST and so
+    would otherwise parse and spool the whole body before the view's own
+    size check could reject it.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if request.content_type == 'multipart/form-data':
+            if _content_length(request) > settings.MAX_UPLOAD_SIZE + MULTIPART_OVERHEAD:
+                max_mb = settings.MAX_UPLOAD_SIZE // (1024 * 1024)
+                return JsonResponse({
+                    'success': False,
+                    'error': f'File too large. Maximum size is {max_mb}MB.'
+                }, status=413)
+
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        # Runs once the view is known, still before the body is read
+        if request.content_type == 'application/json':
+            limit = getattr(view_func, 'max_json_body_size', settings.MAX_JSON_BODY_SIZE)
+            if _content_length(request) > limit:
+                return JsonResponse({
+                    'success': False,
+                    'error': 'Request body too large'
+                }, status=413)
+        return None
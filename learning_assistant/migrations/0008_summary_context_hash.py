@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-16 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learning_assistant', '0007_chatbot_models'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='summary',
+            name='context_hash',
+            field=models.CharField(blank=True, db_index=True, help_text='SHA-256 of the context the summary was generated from', max_length=64),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 6.0.1 on 2026-10-16 10:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learning_assistant', '0009_generationjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='gemini_cache_expires_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='document',
+            name='gemini_cache_hash',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='document',
+            name='gemini_cache_name',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+    ]
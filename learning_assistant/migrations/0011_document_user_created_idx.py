@@ -0,0 +1,19 @@
+# Generated by Django 6.0.1 on 2026-10-16 10:31
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learning_assistant', '0010_document_gemini_cache'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='document',
+            index=models.Index(fields=['user', '-created_at'], name='document_user_created_idx'),
+        ),
+    ]
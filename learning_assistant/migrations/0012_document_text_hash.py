@@ -0,0 +1,29 @@
+# Generated by Django 6.0.1 on 2026-10-16 10:52
+
+import hashlib
+
+from django.db import migrations, models
+
+
+def fill_text_hash(apps, schema_editor):
+    Document = apps.get_model('learning_assistant', 'Document')
+    for document in Document.objects.exclude(extracted_text='').only('id', 'extracted_text').iterator():
+        Document.objects.filter(pk=document.pk).update(
+            text_hash=hashlib.sha256(document.extracted_text.encode('utf-8')).hexdigest()
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learning_assistant', '0011_document_user_created_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='text_hash',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.RunPython(fill_text_hash, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 6.0.1 on 2026-10-16 11:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learning_assistant', '0012_document_text_hash'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='summary',
+            index=models.Index(fields=['document', 'summary_type', 'context_hash'], name='summary_doc_type_hash_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 6.0.1 on 2026-10-16 11:14
+
+from django.db import DatabaseError, migrations, transaction
+
+
+def set_compression(method):
+    def forwards(apps, schema_editor):
+        connection = schema_editor.connection
+        # Per-column compression needs PostgreSQL 14+; lz4 also needs a
+        # server built with it, otherwise keep the default (pglz)
+        if connection.vendor != 'postgresql' or connection.pg_version < 140000:
+            return
+        Document = apps.get_model('learning_assistant', 'Document')
+        table = schema_editor.quote_name(Document._meta.db_table)
+        try:
+            with transaction.atomic():
+                schema_editor.execute(
+                    f'ALTER TABLE {table} ALTER COLUMN extracted_text SET COMPRESSION {method}'
+                )
+        except DatabaseError:
+            pass
+    return forwards
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learning_assistant', '0013_summary_doc_type_hash_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(set_compression('lz4'), set_compression('pglz')),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-16 11:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learning_assistant', '0014_document_extracted_text_lz4'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='flashcardset',
+            name='cards_json',
+            field=models.TextField(blank=True),
+        ),
+    ]
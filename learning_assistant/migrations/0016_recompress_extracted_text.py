@@ -0,0 +1,57 @@
+# Generated by Django 6.0.1 on 2026-10-16 11:58
+
+from django.db import migrations
+
+
+BATCH_SIZE = 500
+
+
+def recompress_extracted_text(apps, schema_editor):
+    """
+    Rewrite extracted_text values still stored with pglz as lz4.
+
+    SET COMPRESSION (0014) only applies to newly written values, and
+    PostgreSQL copies already-compressed values unchanged, so each value is
+    rebuilt with `|| ''` to make the server compress it again.
+    """
+    connection = schema_editor.connection
+    if connection.vendor != 'postgresql' or connection.pg_version < 140000:
+        return
+
+    Document = apps.get_model('learning_assistant', 'Document')
+    table = schema_editor.quote_name(Document._meta.db_table)
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT attcompression FROM pg_attribute "
+            "WHERE attrelid = %s::regclass AND attname = 'extracted_text'",
+            [Document._meta.db_table],
+        )
+        row = cursor.fetchone()
+        if not row or row[0] != 'l':
+            # lz4 is unavailable on this server; nothing to convert to
+            return
+
+        while True:
+            cursor.execute(
+                f"UPDATE {table} SET extracted_text = extracted_text || '' "
+                f"WHERE id IN ("
+                f"SELECT id FROM {table} "
+                f"WHERE pg_column_compression(extracted_text) = 'pglz' "
+                f"LIMIT {BATCH_SIZE})"
+            )
+            if cursor.rowcount < BATCH_SIZE:
+                break
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('learning_assistant', '0015_flashcardset_cards_json'),
+    ]
+
+    operations = [
+        migrations.RunPython(recompress_extracted_text, migrations.RunPython.noop),
+    ]
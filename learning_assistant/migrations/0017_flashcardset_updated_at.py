@@ -0,0 +1,20 @@
+# Generated by Django 6.0.1 on 2026-10-16 12:05
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learning_assistant', '0016_recompress_extracted_text'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='flashcardset',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 6.0.1 on 2026-10-16 12:20
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learning_assistant', '0017_flashcardset_updated_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='document',
+            name='document_user_created_idx',
+        ),
+        migrations.AddIndex(
+            model_name='document',
+            index=models.Index(fields=['user', '-created_at'], include=['id', 'title', 'file_type', 'page_count', 'is_indexed'], name='document_user_created_cov_idx'),
+        ),
+    ]
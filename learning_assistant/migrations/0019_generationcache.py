@@ -0,0 +1,25 @@
+# Generated by Django 6.0.1 on 2026-10-16 12:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learning_assistant', '0018_document_user_created_cov_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GenerationCache',
+            fields=[
+                ('key', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('result', models.JSONField()),
+                ('updated_at', models.DateTimeField(auto_now=True, db_index=True)),
+            ],
+            options={
+                'verbose_name': 'Generation Cache Entry',
+                'verbose_name_plural': 'Generation Cache Entries',
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-16 13:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learning_assistant', '0019_generationcache'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='chars_per_token',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-16 13:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learning_assistant', '0020_document_chars_per_token'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='flowchart',
+            name='graph_json',
+            field=models.TextField(blank=True),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 6.0.1 on 2026-10-16 13:50
+
+from django.db import migrations, models
+from django.db.models.functions import Length
+
+
+def fill_text_len(apps, schema_editor):
+    Document = apps.get_model('learning_assistant', 'Document')
+    Document.objects.exclude(extracted_text='').update(text_len=Length('extracted_text'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learning_assistant', '0021_flowchart_graph_json'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='text_len',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(fill_text_len, migrations.RunPython.noop),
+    ]
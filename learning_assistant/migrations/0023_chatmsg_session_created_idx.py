@@ -0,0 +1,17 @@
+# Generated by Django 6.0.1 on 2026-10-16 14:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learning_assistant', '0022_document_text_len'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='chatmessage',
+            index=models.Index(fields=['session', 'created_at'], name='chatmsg_session_created_idx'),
+        ),
+    ]
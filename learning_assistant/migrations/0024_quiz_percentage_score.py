@@ -0,0 +1,30 @@
+# Generated by Django 6.0.1 on 2026-10-16 14:25
+
+from django.db import migrations, models
+
+
+def fill_percentage_score(apps, schema_editor):
+    Quiz = apps.get_model('learning_assistant', 'Quiz')
+    quizzes = []
+    for quiz in Quiz.objects.filter(score__gt=0).only('id', 'score', 'question_count').iterator():
+        if quiz.question_count:
+            # Python rounding, as Quiz.calculate_percentage_score does
+            quiz.percentage_score = round(quiz.score / quiz.question_count * 100)
+            quizzes.append(quiz)
+    Quiz.objects.bulk_update(quizzes, ['percentage_score'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learning_assistant', '0023_chatmsg_session_created_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quiz',
+            name='percentage_score',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.RunPython(fill_percentage_score, migrations.RunPython.noop),
+    ]
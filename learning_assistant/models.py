@@ -5,8 +5,26 @@ Models for documents, summaries, and other learning content.
 """
 
 import uuid
+import hashlib
+import orjson
 from django.db import models
+from django.db.models import F, FloatField, IntegerField, Value
+from django.db.models.functions import Cast, Coalesce, Substr
 from django.conf import settings
+from django.utils import timezone
+
+
+# Characters per token assumed for documents whose ratio was never measured
+DEFAULT_CHARS_PER_TOKEN = 4.0
+
+# Same escapes as Django's json_script, so stored JSON can be output
+# directly inside a <script> element
+_JSON_SCRIPT_ESCAPES = {ord('>'): '\\u003E', ord('<'): '\\u003C', ord('&'): '\\u0026'}
+
+
+def dumps_for_script(value):
+    """Serialize value to JSON that is safe inside a <script> element."""
+    return orjson.dumps(value).decode().translate(_JSON_SCRIPT_ESCAPES)
 
 
 def document_upload_path(instance, filename):
@@ -41,14 +59,27 @@ class Document(models.Model):
     file_type = models.CharField(max_length=20, choices=FILE_TYPE_CHOICES)
     file_size = models.PositiveIntegerField(default=0)  # in bytes
     
-    # Extracted content
+    # Extracted content (stored lz4-compressed by PostgreSQL's TOAST)
     extracted_text = models.TextField(blank=True)
+    # SHA-256 of extracted_text ('' when there is no text), so callers can
+    # check for content and match caches without loading the text
+    text_hash = models.CharField(max_length=64, blank=True)
+    # Characters per Gemini token in extracted_text, measured once at
+    # extraction (null if it could not be counted)
+    chars_per_token = models.FloatField(null=True, blank=True)
+    # len(extracted_text), so its size is known without loading it
+    text_len = models.PositiveIntegerField(default=0)
     page_count = models.PositiveIntegerField(default=0)
     
     # Vector store info
     is_indexed = models.BooleanField(default=False)
     chunk_count = models.PositiveIntegerField(default=0)
     
+    # Gemini context cache holding the summary prompt + document context
+    gemini_cache_name = models.CharField(max_length=255, blank=True)
+    gemini_cache_hash = models.CharField(max_length=64, blank=True)
+    gemini_cache_expires_at = models.DateTimeField(null=True, blank=True)
+    
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -57,10 +88,86 @@ class Document(models.Model):
         ordering = ['-created_at']
         verbose_name = 'Document'
         verbose_name_plural = 'Documents'
+        indexes = [
+            # Covers the document lists (views.DOCUMENT_LIST_FIELDS), so
+            # they are answered by an index-only scan
+            models.Index(
+                fields=['user', '-created_at'],
+                include=['id', 'title', 'file_type', 'page_count', 'is_indexed'],
+                name='document_user_created_cov_idx',
+            ),
+        ]
     
     def __str__(self):
         return self.title
     
+    @staticmethod
+    def hash_text(text):
+        """Return the text_hash value for a piece of extracted text."""
+        return hashlib.sha256(text.encode('utf-8')).hexdigest() if text else ''
+    
+    @staticmethod
+    def context_annotations(max_tokens):
+        """
+        Annotations selecting the start of extracted_text that fits max_tokens.
+        
+        'context_chars' is the character budget for max_tokens and
+        'context_prefix' the text up to one character past it, so
+        clipped_context() can tell whether it was cut without the database
+        sending the whole text.
+        """
+        chars = Cast(
+            Value(float(max_tokens)) * Coalesce(
+                F('chars_per_token'), Value(DEFAULT_CHARS_PER_TOKEN), output_field=FloatField()
+            ),
+            IntegerField(),
+        )
+        return {
+            'context_chars': chars,
+            'context_prefix': Substr('extracted_text', 1, chars + 1),
+        }
+    
+    def clipped_context(self):
+        """Return the text selected by context_annotations(), marked if cut."""
+        context = self.context_prefix
+        if len(context) > self.context_chars:
+            context = context[:self.context_chars] + "\n\n[... Content truncated for processing ...]"
+        return context
+    
+    def get_truncated_context(self, max_chars, marker='[... Content truncated ...]'):
+        """
+        Return the first max_chars characters of extracted_text, marked if cut.
+        
+        When extracted_text was deferred, only that prefix is read from the
+        database.
+        """
+        if 'extracted_text' in self.get_deferred_fields():
+            text = Document.objects.filter(pk=self.pk).annotate(
+                prefix=Substr('extracted_text', 1, max_chars + 1)
+            ).values_list('prefix', flat=True).get()
+        else:
+            text = self.extracted_text[:max_chars + 1]
+        if len(text) > max_chars:
+            text = text[:max_chars] + "\n\n" + marker
+        return text
+    
+    def count_tokens(self, text, agent):
+        """
+        Count the tokens in text (this document's extracted text).
+        
+        Uses the ratio measured at extraction when known instead of a
+        count_tokens call to Gemini.
+        """
+        if self.chars_per_token:
+            return round(len(text) / self.chars_per_token)
+        return agent.count_tokens(text)
+    
+    def estimate_tokens(self):
+        """Token count of extracted_text from stored stats, or None if unmeasured."""
+        if self.chars_per_token and self.text_len:
+            return round(self.text_len / self.chars_per_token)
+        return None
+    
     @property
     def vector_doc_id(self):
         """Get the document ID used for vector storage."""
@@ -97,6 +204,12 @@ class Summary(models.Model):
     content = models.TextField()
     summary_type = models.CharField(max_length=20, choices=SUMMARY_TYPE_CHOICES)
     word_count = models.PositiveIntegerField(default=0)
+    context_hash = models.CharField(
+        max_length=64,
+        blank=True,
+        db_index=True,
+        help_text='SHA-256 of the context the summary was generated from'
+    )
     
     # Generation metadata
     model_used = models.CharField(max_length=100, blank=True)
@@ -108,6 +221,9 @@ class Summary(models.Model):
         ordering = ['-created_at']
         verbose_name = 'Summary'
         verbose_name_plural = 'Summaries'
+        indexes = [
+            models.Index(fields=['document', 'summary_type', 'context_hash'], name='summary_doc_type_hash_idx'),
+        ]
     
     def __str__(self):
         return f"{self.summary_type.title()} summary of {self.document.title}"
@@ -145,6 +261,8 @@ class Quiz(models.Model):
     
     # Quiz results
     score = models.PositiveIntegerField(null=True, blank=True)
+    # Score as a whole percentage, set with score (see calculate_percentage_score)
+    percentage_score = models.PositiveSmallIntegerField(default=0)
     xp_earned = models.PositiveIntegerField(default=0)
     is_completed = models.BooleanField(default=False)
     completed_at = models.DateTimeField(null=True, blank=True)
@@ -168,9 +286,8 @@ class Quiz(models.Model):
         """Get number of correctly answered questions."""
         return self.questions.filter(user_answer=models.F('correct_answer')).count()
     
-    @property
-    def percentage_score(self):
-        """Get score as percentage."""
+    def calculate_percentage_score(self):
+        """Calculate the score as a percentage."""
         if self.question_count == 0:
             return 0
         return round((self.score or 0) / self.question_count * 100)
@@ -283,11 +400,16 @@ class FlashcardSet(models.Model):
     cards_mastered = models.PositiveIntegerField(default=0)
     last_studied_at = models.DateTimeField(null=True, blank=True)
     
+    # Cards serialized for the study page; '' when it must be rebuilt
+    cards_json = models.TextField(blank=True)
+    
     # Generation metadata
     model_used = models.CharField(max_length=100, blank=True)
     generation_time = models.FloatField(default=0)
     
     created_at = models.DateTimeField(auto_now_add=True)
+    # Bumped when the cards change; saves touching only study progress skip it
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         ordering = ['-created_at']
@@ -308,6 +430,18 @@ class FlashcardSet(models.Model):
     def is_completed(self):
         """Check if all cards have been mastered."""
         return self.cards_mastered >= self.card_count
+    
+    @staticmethod
+    def serialize_cards(cards):
+        """Serialize cards to the JSON list the study page reads."""
+        return dumps_for_script([{
+            'id': str(card.id),
+            'front': card.front,
+            'back': card.back,
+            'priority': card.priority,
+            'is_mastered': card.is_mastered,
+            'order': card.order,
+        } for card in cards])
 
 
 class Flashcard(models.Model):
@@ -363,13 +497,28 @@ class Flashcard(models.Model):
     
     def toggle_mastered(self):
         """Toggle mastered status and update parent set."""
-        self.is_mastered = not self.is_mastered
-        self.save(update_fields=['is_mastered'])
+        mastered = not self.is_mastered
+        
+        # Only a request that actually flips the row adjusts the count, so
+        # concurrent toggles cannot double count
+        flipped = Flashcard.objects.filter(id=self.id, is_mastered=self.is_mastered).update(
+            is_mastered=mastered
+        )
+        self.is_mastered = mastered
+        if not flipped:
+            return
         
-        # Update parent set's mastered count
-        mastered_count = self.flashcard_set.cards.filter(is_mastered=True).count()
-        self.flashcard_set.cards_mastered = mastered_count
-        self.flashcard_set.save(update_fields=['cards_mastered'])
+        # Adjust parent set's mastered count in place (no COUNT over its
+        # cards) and invalidate its serialized cards
+        delta = 1 if mastered else -1
+        FlashcardSet.objects.filter(id=self.flashcard_set_id).update(
+            cards_mastered=F('cards_mastered') + delta,
+            cards_json='',
+            updated_at=timezone.now(),
+        )
+        if Flashcard.flashcard_set.is_cached(self):
+            self.flashcard_set.cards_mastered += delta
+            self.flashcard_set.cards_json = ''
 
 
 class Flowchart(models.Model):
@@ -397,6 +546,9 @@ class Flowchart(models.Model):
     node_count = models.PositiveIntegerField(default=0)
     edge_count = models.PositiveIntegerField(default=0)
     
+    # Nodes and edges serialized for the viewer; '' when it must be rebuilt
+    graph_json = models.TextField(blank=True)
+    
     # Generation metadata
     model_used = models.CharField(max_length=100, blank=True)
     generation_time = models.FloatField(default=0)
@@ -410,6 +562,24 @@ class Flowchart(models.Model):
     
     def __str__(self):
         return f"Flowchart: {self.title}"
+    
+    @staticmethod
+    def serialize_graph(nodes, edges):
+        """Serialize nodes and edges to the JSON object the viewer reads."""
+        return dumps_for_script({
+            'nodes': [{
+                'id': node.node_id,
+                'label': node.label,
+                'type': node.node_type,
+                'x': node.position_x,
+                'y': node.position_y,
+            } for node in nodes],
+            'edges': [{
+                'from': edge.from_node,
+                'to': edge.to_node,
+                'label': edge.label,
+            } for edge in edges],
+        })
 
 
 class FlowchartNode(models.Model):
@@ -772,6 +942,73 @@ class ChatMessage(models.Model):
         ordering = ['created_at']
         verbose_name = 'Chat Message'
         verbose_name_plural = 'Chat Messages'
+        indexes = [
+            models.Index(fields=['session', 'created_at'], name='chatmsg_session_created_idx'),
+        ]
     
     def __str__(self):
         return f"[{self.role}] {self.content[:50]}..."
+
+
+class GenerationJob(models.Model):
+    """
+    Tracks AI generation work running in the background.
+    
+    Views enqueue a job and return its id immediately; the client polls
+    a status endpoint until the job succeeds or fails. The payload the
+    view would have returned is stored in 'result'.
+    """
+    
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('success', 'Success'),
+        ('failure', 'Failure'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='generation_jobs'
+    )
+    
+    kind = models.CharField(max_length=50)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    result = models.JSONField(default=dict, blank=True)
+    error = models.TextField(blank=True)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = 'Generation Job'
+        verbose_name_plural = 'Generation Jobs'
+    
+    def __str__(self):
+        return f"{self.kind} job ({self.status})"
+    
+    @property
+    def is_finished(self):
+        return self.status in ('success', 'failure')
+
+
+class GenerationCache(models.Model):
+    """
+    Agent results stored by services.response_cache.
+    
+    Backs the in-memory cache so repeat generations are reused across
+    restarts and across web instances.
+    """
+    
+    key = models.CharField(max_length=100, primary_key=True)
+    result = models.JSONField()
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+    
+    class Meta:
+        verbose_name = 'Generation Cache Entry'
+        verbose_name_plural = 'Generation Cache Entries'
+    
+    def __str__(self):
+        return self.key
@@ -10,14 +10,25 @@ Services are designed to be:
 - Easily testable
 """
 
-from .document_processor import DocumentProcessor
-from .vector_store import VectorStoreService
+from .document_processor import DocumentProcessor, get_document_processor
+from .vector_store import VectorStoreService, get_vector_store
+from .embedding_cache import QueryEmbeddingCache
 from .ocr_service import OCRService, ocr_service
+from .jobs import enqueue_job, expire_stale_job, run_in_background
+from .response_cache import ResponseCache, response_cache
 
 __all__ = [
     'DocumentProcessor',
+    'get_document_processor',
     'VectorStoreService',
+    'get_vector_store',
+    'QueryEmbeddingCache',
     'OCRService',
     'ocr_service',
+    'enqueue_job',
+    'expire_stale_job',
+    'run_in_background',
+    'ResponseCache',
+    'response_cache',
 ]
 
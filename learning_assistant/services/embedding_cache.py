@@ -0,0 +1,125 @@
+"""
+Query Embedding Cache
+
+Persists query embeddings in a small SQLite database so repeated
+chatbot questions skip the embedding API round-trip.
+"""
+
+import hashlib
+import sqlite3
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional, Sequence
+
+import numpy as np
+
+
+class QueryEmbeddingCache:
+    """
+    Exact-match cache mapping query text to its embedding vector.
+
+    Keys are SHA-256 hashes of the embedding model name plus the
+    whitespace-normalized query. Least recently used entries are evicted
+    once the cache grows past MAX_ENTRIES.
+
+    Usage:
+        cache = QueryEmbeddingCache(path, model_name)
+        vector = cache.get(query)
+        if vector is None:
+            vector = embed(query)
+            cache.set(query, vector)
+    """
+
+    MAX_ENTRIES = 10_000
+
+    def __init__(self, db_path: Path, model_name: str):
+        """
+        Initialize the cache.
+
+        Args:
+            db_path: Path to the SQLite database file
+            model_name: Embedding model name, included in every key
+        """
+        self.db_path = str(db_path)
+        self.model_name = model_name
+
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS query_embeddings ("
+                "key TEXT PRIMARY KEY, "
+                "vector BLOB NOT NULL, "
+                "last_used REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS query_embeddings_last_used "
+                "ON query_embeddings (last_used)"
+            )
+
+    @contextmanager
+    def _connect(self):
+        """Open a short-lived connection (safe across worker threads)."""
+        conn = sqlite3.connect(self.db_path, timeout=5)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _key(self, query: str) -> str:
+        """Build the cache key for a query."""
+        normalized = " ".join(query.split())
+        return hashlib.sha256(f"{self.model_name}\n{normalized}".encode('utf-8')).hexdigest()
+
+    def get(self, query: str) -> Optional[np.ndarray]:
+        """
+        Look up a cached embedding.
+
+        Args:
+            query: Query text
+
+        Returns:
+            float32 vector, or None on a miss
+        """
+        key = self._key(query)
+        try:
+            with self._connect() as conn:
+                row = conn.execute(
+                    "SELECT vector FROM query_embeddings WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    return None
+                conn.execute(
+                    "UPDATE query_embeddings SET last_used = ? WHERE key = ?",
+                    (time.time(), key),
+                )
+        except sqlite3.Error:
+            return None
+
+        return np.frombuffer(row[0], dtype=np.float32)
+
+    def set(self, query: str, vector: Sequence[float]) -> None:
+        """
+        Store an embedding and evict the oldest entries if over capacity.
+
+        Args:
+            query: Query text
+            vector: Embedding vector
+        """
+        blob = np.asarray(vector, dtype=np.float32).tobytes()
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO query_embeddings (key, vector, last_used) "
+                    "VALUES (?, ?, ?)",
+                    (self._key(query), blob, time.time()),
+                )
+                conn.execute(
+                    "DELETE FROM query_embeddings WHERE key IN ("
+                    "SELECT key FROM query_embeddings "
+                    "ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                    (self.MAX_ENTRIES,),
+                )
+        except sqlite3.Error:
+            # The cache is best-effort; a failed write just means a future miss
+            pass
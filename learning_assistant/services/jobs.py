@@ -0,0 +1,194 @@
+"""
+Background Jobs
+
+Runs slow AI generation work on a thread pool so request workers are
+freed immediately. Job state is stored in GenerationJob rows, so any web
+worker can answer a status poll for a job started by another.
+
+The pool lives in the web process: a job whose worker is recycled
+mid-run is never finished. Running jobs touch updated_at every
+HEARTBEAT_INTERVAL seconds, and status polls mark a job as failed once it
+has gone GENERATION_JOB_TIMEOUT seconds without starting or without a
+heartbeat.
+"""
+
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import Any, Callable, Dict
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.utils import timezone
+
+
+logger = logging.getLogger(__name__)
+
+# Seconds between updated_at touches while a job runs; keep well below
+# GENERATION_JOB_TIMEOUT
+HEARTBEAT_INTERVAL = 60
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """Return this process's job pool, creating it after startup or a fork."""
+    global _executor, _executor_pid
+
+    pid = os.getpid()
+    if _executor_pid != pid:
+        with _executor_lock:
+            if _executor_pid != pid:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'GENERATION_JOB_WORKERS', 4),
+                    thread_name_prefix='generation-job',
+                )
+                _executor_pid = pid
+    return _executor
+
+
+def enqueue_job(user, kind: str, func: Callable[..., Dict[str, Any]], *args, **kwargs):
+    """
+    Create a GenerationJob and run func(*args, **kwargs) in the background.
+
+    func must return the repo's usual result dict: 'success' plus payload
+    keys on success, or 'error' on failure. The whole dict is stored on the
+    job on success.
+
+    Args:
+        user: Owner of the job
+        kind: Job type, e.g. 'summary'
+        func: Callable doing the work
+
+    Returns:
+        The pending GenerationJob
+    """
+    from ..models import GenerationJob
+
+    job = GenerationJob.objects.create(user=user, kind=kind)
+
+    # Start only once the job row is visible to the worker thread
+    transaction.on_commit(
+        lambda: _get_executor().submit(_run_job, job.id, func, args, kwargs)
+    )
+    return job
+
+
+def expire_stale_job(job) -> bool:
+    """
+    Mark a pending job that never started, or a running job whose
+    heartbeat stopped, as failed.
+
+    The update is conditional, so a job that finishes concurrently keeps
+    its result.
+
+    Args:
+        job: GenerationJob to check; updated in place when expired
+
+    Returns:
+        True if the job was expired
+    """
+    if job.is_finished:
+        return False
+
+    now = timezone.now()
+    cutoff = now - timedelta(seconds=getattr(settings, 'GENERATION_JOB_TIMEOUT', 900))
+    if job.updated_at >= cutoff:
+        return False
+
+    error = 'Generation timed out. Please try again.'
+    expired = type(job).objects.filter(
+        id=job.id, status__in=('pending', 'running'), updated_at__lt=cutoff,
+    ).update(status='failure', error=error, updated_at=now)
+    if not expired:
+        # Finished in the meantime
+        job.refresh_from_db()
+        return False
+
+    logger.warning('Job %s (%s) expired in status %s', job.id, job.kind, job.status)
+    job.status, job.error, job.updated_at = 'failure', error, now
+    return True
+
+
+def run_in_background(func: Callable[..., Any], *args, **kwargs) -> None:
+    """
+    Run func(*args, **kwargs) on the job pool without a GenerationJob.
+
+    For fire-and-forget work, such as cleanup, whose outcome nobody polls.
+    Failures are logged.
+    """
+    transaction.on_commit(
+        lambda: _get_executor().submit(_run_untracked, func, args, kwargs)
+    )
+
+
+def _run_untracked(func, args, kwargs) -> None:
+    """Execute a run_in_background call."""
+    close_old_connections()
+    try:
+        func(*args, **kwargs)
+    except Exception:
+        logger.exception('Background task %s failed', func.__name__)
+    finally:
+        close_old_connections()
+
+
+def _run_job(job_id, func, args, kwargs) -> None:
+    """Execute a job and record its outcome."""
+    from ..models import GenerationJob
+
+    close_old_connections()
+    jobs = GenerationJob.objects.filter(id=job_id)
+
+    try:
+        # Only a job still pending starts; an expired one stays failed
+        if not jobs.filter(status='pending').update(
+            status='running', updated_at=timezone.now()
+        ):
+            return
+
+        stop = threading.Event()
+        threading.Thread(
+            target=_heartbeat, args=(job_id, stop),
+            name='generation-job-heartbeat', daemon=True,
+        ).start()
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            logger.exception('Job %s (%s) failed', job_id, func.__name__)
+            result = {'success': False, 'error': f'Generation failed: {str(e)}'}
+        finally:
+            stop.set()
+
+        # Conditional, so a job expire_stale_job already failed stays failed
+        running = jobs.filter(status='running')
+        if result.get('success'):
+            running.update(status='success', result=result, updated_at=timezone.now())
+        else:
+            running.update(
+                status='failure',
+                error=result.get('error') or 'Generation failed',
+                updated_at=timezone.now(),
+            )
+    finally:
+        close_old_connections()
+
+
+def _heartbeat(job_id, stop: threading.Event) -> None:
+    """Touch a running job's updated_at until stop is set."""
+    from ..models import GenerationJob
+
+    try:
+        while not stop.wait(HEARTBEAT_INTERVAL):
+            GenerationJob.objects.filter(id=job_id, status='running').update(
+                updated_at=timezone.now()
+            )
+    except Exception:
+        logger.exception('Heartbeat for job %s failed', job_id)
+    finally:
+        # This thread's connection is not reused
+        connection.close()
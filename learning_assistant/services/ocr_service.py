@@ -3,35 +3,143 @@ OCR Service for Answer Sheet Evaluation
 
 Uses EasyOCR to extract handwritten text from images and PDFs.
 EasyOCR provides good handwriting recognition with numpy 2.x compatibility.
+
+Pages are recognized in parallel on a small thread pool. To avoid
+oversubscribing the CPU, torch's intra-op thread count is set to
+cpu_count // OCR_WORKERS, and OMP_NUM_THREADS / MKL_NUM_THREADS default to
+the same value before torch is first imported. Set those environment
+variables explicitly to override the split.
 """
 
 import os
+import logging
 import tempfile
-from typing import Optional
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
 from PIL import Image
 import io
 
+from django.conf import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+def _cpu_supports_bf16(torch) -> bool:
+    """Check whether the CPU has native bfloat16 (AVX512_BF16) kernels."""
+    check = getattr(torch.cpu, '_is_avx512_bf16_supported', None)
+    return bool(check and check())
+
+
+def _to_float32(output):
+    """Cast floating tensors back to fp32 so EasyOCR's numpy post-processing works."""
+    if isinstance(output, (tuple, list)):
+        return type(output)(_to_float32(item) for item in output)
+    if hasattr(output, 'is_floating_point') and output.is_floating_point():
+        return output.float()
+    return output
+
 
 class OCRService:
     """Service for extracting text from images and PDFs using EasyOCR."""
     
     def __init__(self):
         self._reader = None
+        # Page workers and concurrent jobs may ask for the reader at once
+        self._reader_lock = threading.Lock()
         self._languages = ['en']  # Can add more languages if needed
+        
+        # Pages run concurrently; each worker gets its own slice of cores
+        cpu_count = os.cpu_count() or 1
+        self.workers = min(4, cpu_count)
+        self.threads_per_worker = max(1, cpu_count // self.workers)
+        self._pool = ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix='ocr'
+        )
     
     @property
     def reader(self):
         """Lazy-load EasyOCR reader to avoid import overhead."""
         if self._reader is None:
-            try:
-                import easyocr
-                self._reader = easyocr.Reader(self._languages, gpu=False)
-            except ImportError:
-                raise ImportError(
-                    "EasyOCR is not installed. Install it with: pip install easyocr"
-                )
+            with self._reader_lock:
+                if self._reader is None:
+                    self._reader = self._load_reader()
         return self._reader
     
+    def _load_reader(self):
+        """Build and configure the EasyOCR reader."""
+        # OpenMP/MKL read these once, when torch is first imported
+        for var in ('OMP_NUM_THREADS', 'MKL_NUM_THREADS'):
+            os.environ.setdefault(var, str(self.threads_per_worker))
+        try:
+            import easyocr
+            reader = easyocr.Reader(self._languages, gpu=False)
+        except ImportError:
+            raise ImportError(
+                "EasyOCR is not installed. Install it with: pip install easyocr"
+            )
+        import torch
+        torch.set_num_threads(self.threads_per_worker)
+        if getattr(settings, 'OCR_TORCH_COMPILE', False):
+            self._optimize_reader(reader)
+        # Published only once fully configured
+        return reader
+
+    @staticmethod
+    def _optimize_reader(reader):
+        """
+        Compile the detector and recognizer networks with torch.compile.
+
+        On CPUs with AVX512_BF16 the forward passes also run under bf16
+        autocast; outputs are cast back to fp32 for EasyOCR's post-processing.
+        """
+        import torch
+
+        if not hasattr(torch, 'compile'):
+            return
+
+        use_bf16 = _cpu_supports_bf16(torch)
+
+        for attr in ('detector', 'recognizer'):
+            compiled = torch.compile(getattr(reader, attr), dynamic=True)
+            if use_bf16:
+                forward = compiled.forward
+
+                def bf16_forward(*args, _forward=forward, **kwargs):
+                    with torch.autocast('cpu', dtype=torch.bfloat16):
+                        return _to_float32(_forward(*args, **kwargs))
+
+                compiled.forward = bf16_forward
+            setattr(reader, attr, compiled)
+
+    def _readtext(self, image):
+        """Run EasyOCR on an image path or array with autograd disabled."""
+        import torch
+
+        reader = self.reader
+        with torch.inference_mode():
+            return reader.readtext(image)
+
+    def warmup(self) -> bool:
+        """
+        Load the reader's weights ahead of the first request.
+
+        No inference runs here: with `gunicorn --preload` this is called in
+        the master before it forks, and the OpenMP/MKL thread pools that
+        inference starts are not fork-safe.
+
+        Returns:
+            True if the reader was loaded, False if loading failed (it is
+            retried on first use)
+        """
+        try:
+            self.reader
+        except Exception:
+            logger.exception('OCR warmup failed; the model will load on first use')
+            return False
+        return True
+
     def extract_from_image(self, image_path: str) -> str:
         """
         Extract text from a single image file.
@@ -42,7 +150,33 @@ class OCRService:
         Returns:
             Extracted text as a string
         """
-        results = self.reader.readtext(image_path)
+        return self._extract_from_ndarray(image_path)
+    
+    def extract_many_images(self, image_paths: List[str]) -> List[str]:
+        """
+        Extract text from several image files in parallel.
+        
+        Args:
+            image_paths: Paths to the image files
+            
+        Returns:
+            Extracted text for each image, in input order
+        """
+        # Load the reader up front so workers don't race to initialize it
+        self.reader
+        return list(self._pool.map(self._extract_from_ndarray, image_paths))
+    
+    def _extract_from_ndarray(self, image) -> str:
+        """
+        Run OCR on an image path or decoded pixel array.
+        
+        Args:
+            image: Path to an image file, or an HxWxC uint8 numpy array
+            
+        Returns:
+            Extracted text as a string
+        """
+        results = self._readtext(image)
         
         # EasyOCR returns list of (bbox, text, confidence) tuples
         # Sort by vertical position (y-coordinate) for proper reading order
@@ -70,23 +204,26 @@ class OCRService:
                 "Also ensure Poppler is installed on your system."
             )
         
-        # Convert PDF pages to images
-        images = convert_from_path(pdf_path)
+        import numpy as np
         
-        all_text = []
-        for i, image in enumerate(images, 1):
-            # Save image temporarily
-            with tempfile.NamedTemporaryFile(suffix='.png', delete=False) as tmp:
-                image.save(tmp.name, 'PNG')
-                tmp_path = tmp.name
-            
-            try:
-                page_text = self.extract_from_image(tmp_path)
-                all_text.append(f"--- Page {i} ---\n{page_text}")
-            finally:
-                # Clean up temp file
-                if os.path.exists(tmp_path):
-                    os.remove(tmp_path)
+        # Convert PDF pages to images (Poppler rasterizes pages in parallel)
+        images = convert_from_path(
+            pdf_path,
+            dpi=200,
+            thread_count=os.cpu_count() or 1,
+            fmt='jpeg',
+        )
+        
+        # Hand the decoded pixels straight to EasyOCR; no PNG round-trip
+        self.reader
+        page_texts = self._pool.map(
+            self._extract_from_ndarray, (np.asarray(image) for image in images)
+        )
+        
+        all_text = [
+            f"--- Page {i} ---\n{page_text}"
+            for i, page_text in enumerate(page_texts, 1)
+        ]
         
         return '\n\n'.join(all_text)
     
@@ -101,6 +238,12 @@ class OCRService:
             Extracted text as a string
         """
         file_ext = uploaded_file.name.lower().split('.')[-1]
+        if file_ext not in ('pdf', 'png', 'jpg', 'jpeg'):
+            raise ValueError(f"Unsupported file type: {file_ext}")
+        
+        # Uploads spooled to disk (FILE_UPLOAD_HANDLERS) are read in place
+        if hasattr(uploaded_file, 'temporary_file_path'):
+            return self._extract_from_path(uploaded_file.temporary_file_path(), file_ext)
         
         # Reset file position
         uploaded_file.seek(0)
@@ -112,16 +255,17 @@ class OCRService:
             tmp_path = tmp.name
         
         try:
-            if file_ext == 'pdf':
-                return self.extract_from_pdf(tmp_path)
-            elif file_ext in ['png', 'jpg', 'jpeg']:
-                return self.extract_from_image(tmp_path)
-            else:
-                raise ValueError(f"Unsupported file type: {file_ext}")
+            return self._extract_from_path(tmp_path, file_ext)
         finally:
             # Clean up temp file
             if os.path.exists(tmp_path):
                 os.remove(tmp_path)
+    
+    def _extract_from_path(self, path: str, file_ext: str) -> str:
+        """Dispatch a PDF or image file on disk to the matching extractor."""
+        if file_ext == 'pdf':
+            return self.extract_from_pdf(path)
+        return self.extract_from_image(path)
 
 
 # Singleton instance
@@ -0,0 +1,130 @@
+"""
+Agent Response Cache
+
+Reuses agent results for repeat generations. Keys combine the agent kind,
+its generation parameters and a SHA-256 of the context, so the same
+document text with the same options (from any user) skips the Gemini call.
+Results are kept in Django's cache and written through to the
+GenerationCache table, which outlives restarts and is shared by instances.
+Identical requests that arrive while one is still generating wait for it
+instead of calling Gemini again.
+"""
+
+import datetime
+import hashlib
+import json
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+
+class ResponseCache:
+    """
+    Exact-match cache for successful agent results, stored in Django's cache
+    and the GenerationCache table.
+
+    Usage:
+        result = response_cache.get_or_generate(
+            'quiz', {'difficulty': 'easy'}, context_hash,
+            lambda: agent.generate_sync(context, difficulty='easy'),
+        )
+    """
+
+    KEY_PREFIX = 'agent-response'
+
+    def __init__(self):
+        # Generations running in this process, keyed like the cache
+        self._inflight: Dict[str, Future] = {}
+        self._inflight_lock = threading.Lock()
+
+    def make_key(self, kind: str, params: Dict[str, Any], context_hash: str) -> str:
+        """Build the cache key for a generation request."""
+        raw = f"{kind}:{json.dumps(params, sort_keys=True)}:{context_hash}"
+        return f"{self.KEY_PREFIX}:{hashlib.sha256(raw.encode('utf-8')).hexdigest()}"
+
+    @staticmethod
+    def _timeout() -> int:
+        """Seconds a result stays reusable."""
+        return getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 24 * 60 * 60)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Look up a cached result, or None on a miss."""
+        from ..models import GenerationCache
+
+        result = cache.get(key)
+        if result is None:
+            fresh_since = timezone.now() - datetime.timedelta(seconds=self._timeout())
+            result = GenerationCache.objects.filter(
+                key=key, updated_at__gte=fresh_since
+            ).values_list('result', flat=True).first()
+            if result is not None:
+                cache.set(key, result, self._timeout())
+        return result
+
+    def set(self, key: str, result: Dict[str, Any]) -> None:
+        """Store a result for RESPONSE_CACHE_TIMEOUT seconds."""
+        from ..models import GenerationCache
+
+        cache.set(key, result, self._timeout())
+        GenerationCache.objects.update_or_create(key=key, defaults={'result': result})
+
+        # Expired rows are never read again; prune them as new ones arrive
+        expired_before = timezone.now() - datetime.timedelta(seconds=self._timeout())
+        GenerationCache.objects.filter(updated_at__lt=expired_before).delete()
+
+    def get_or_generate(
+        self,
+        kind: str,
+        params: Dict[str, Any],
+        context_hash: str,
+        generate: Callable[[], Dict[str, Any]],
+    ) -> Dict[str, Any]:
+        """
+        Return a cached result, or call generate() and cache it on success.
+
+        If the same request is already generating on another thread, its
+        result (or exception) is shared rather than generating twice.
+
+        Args:
+            kind: Agent name, e.g. 'quiz'
+            params: Generation options; must be JSON-serializable
+            context_hash: SHA-256 of the exact context sent to the agent
+            generate: Callable returning the agent's result dict
+
+        Returns:
+            The agent result dict
+        """
+        key = self.make_key(kind, params, context_hash)
+        result = self.get(key)
+        if result is not None:
+            return result
+
+        with self._inflight_lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = self._inflight[key] = Future()
+
+        if not owner:
+            return future.result()
+
+        try:
+            result = generate()
+            if result.get('success'):
+                self.set(key, result)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._inflight_lock:
+                del self._inflight[key]
+
+
+# Singleton instance
+response_cache = ResponseCache()
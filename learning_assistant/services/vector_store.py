@@ -6,18 +6,62 @@ Provides storage and retrieval of document vectors for RAG.
 """
 
 import os
+import re
 import json
+import pickle
+import asyncio
+import threading
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, NamedTuple, Optional
 from django.conf import settings
 
 import faiss
 import numpy as np
+import pyarrow as pa
+from rank_bm25 import BM25Okapi
 
 # Langchain for embeddings
 from langchain_google_genai import GoogleGenerativeAIEmbeddings
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 
+from .embedding_cache import QueryEmbeddingCache
+
+
+# Guards the per-process reset of VectorStoreService's hot cache
+_hot_reset_lock = threading.Lock()
+
+
+@contextmanager
+def _atomic_path(path: Path):
+    """
+    Yield a temporary path next to path, moved over it once written.
+    
+    Other processes reading path see the old file or the new one, never
+    a partial write.
+    """
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        yield tmp
+        os.replace(tmp, path)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+
+
+class _IndexedDocument(NamedTuple):
+    """A loaded document: FAISS index, chunk text and search helpers."""
+    index: Any
+    chunks: pa.Array
+    bm25: Optional[BM25Okapi] = None
+    # Scale applied to unit embeddings before int8 storage; None for
+    # float indices built before int8 ingestion
+    int8_scale: Optional[float] = None
+
 
 class VectorStoreService:
     """
@@ -36,11 +80,44 @@ class VectorStoreService:
     
     # Embedding model configuration
     EMBEDDING_MODEL = "models/embedding-001"
+    EMBED_BATCH_SIZE = 100
+    EMBED_CONCURRENCY = 4
     
     # Text splitting configuration
     CHUNK_SIZE = 1000
     CHUNK_OVERLAP = 200
     
+    # Use the single-pass regex splitter; set False to fall back to
+    # LangChain's RecursiveCharacterTextSplitter
+    USE_FAST_SPLITTER = True
+    SPLIT_POINTS = re.compile(r"\n\n|\n|\. | ")
+    
+    # Index configuration: brute-force search for small documents, an
+    # 8-bit quantized HNSW graph once the chunk count makes scans costly
+    HNSW_MIN_CHUNKS = 5000
+    HNSW_M = 32
+    HNSW_EF_CONSTRUCTION = 80
+    HNSW_EF_SEARCH = 64
+    
+    # Lexical pre-filter: on larger documents, BM25 narrows the candidate
+    # set before FAISS ranks by embedding distance
+    BM25_MIN_CHUNKS = 1000
+    BM25_CANDIDATES = 200
+    TOKEN_PATTERN = re.compile(r"\w+")
+    
+    # Chunks are stored as one Arrow string column next to the index
+    CHUNK_SCHEMA = pa.schema([("chunk", pa.large_string())])
+    
+    # In-process write-through cache of _IndexedDocument for recently built
+    # or loaded documents. FAISS indices are not fork-safe, so the cache is
+    # rebuilt whenever the owning process id changes.
+    HOT_CACHE_SIZE = 32
+    _hot: 'OrderedDict[str, tuple]' = OrderedDict()
+    _pending: Dict[str, Future] = {}
+    _hot_pid: Optional[int] = None
+    _hot_lock = threading.Lock()
+    _writer: Optional[ThreadPoolExecutor] = None
+    
     def __init__(self, store_dir: Optional[str] = None):
         """
         Initialize the vector store service.
@@ -61,6 +138,12 @@ class VectorStoreService:
         else:
             self.embeddings = None
         
+        # Cache of query embeddings so repeated questions skip the API call
+        self.query_cache = QueryEmbeddingCache(
+            self.store_dir / 'query_cache.sqlite3',
+            self.EMBEDDING_MODEL,
+        )
+        
         # Text splitter for chunking documents
         self.text_splitter = RecursiveCharacterTextSplitter(
             chunk_size=self.CHUNK_SIZE,
@@ -74,9 +157,334 @@ class VectorStoreService:
         return self.store_dir / f"{doc_id}.index"
     
     def _get_metadata_path(self, doc_id: str) -> Path:
-        """Get the path for a document's metadata/chunks."""
+        """Get the path for a document's metadata."""
         return self.store_dir / f"{doc_id}.json"
     
+    def _get_chunks_path(self, doc_id: str) -> Path:
+        """Get the path for a document's Arrow chunk store."""
+        return self.store_dir / f"{doc_id}.arrow"
+    
+    def _get_bm25_path(self, doc_id: str) -> Path:
+        """Get the path for a document's pickled BM25 model."""
+        return self.store_dir / f"{doc_id}.bm25"
+    
+    def _tokenize(self, text: str) -> List[str]:
+        """Lowercased word tokens for BM25."""
+        return self.TOKEN_PATTERN.findall(text.lower())
+    
+    def _build_bm25(self, chunks: List[str]) -> Optional[BM25Okapi]:
+        """Build a BM25 model, or None when the document is too small to need one."""
+        if len(chunks) < self.BM25_MIN_CHUNKS:
+            return None
+        return BM25Okapi([self._tokenize(chunk) for chunk in chunks])
+    
+    def _bm25_candidates(self, bm25: BM25Okapi, query: str) -> Optional[np.ndarray]:
+        """
+        Ids of the chunks with the highest BM25 scores for a query.
+        
+        Returns:
+            int64 array of chunk ids, or None if no chunk shares a term with
+            the query (the caller then searches the whole index)
+        """
+        scores = bm25.get_scores(self._tokenize(query))
+        n = min(self.BM25_CANDIDATES, len(scores))
+        top = np.argpartition(-scores, n - 1)[:n]
+        top = top[scores[top] > 0]
+        if len(top) == 0:
+            return None
+        return top.astype('int64')
+    
+    def _write_chunks(self, path: Path, chunks: pa.Array) -> None:
+        """Write chunks as a single Arrow IPC record batch."""
+        with pa.OSFile(str(path), 'wb') as sink:
+            with pa.ipc.new_file(sink, self.CHUNK_SCHEMA) as writer:
+                writer.write_batch(pa.record_batch([chunks], schema=self.CHUNK_SCHEMA))
+    
+    def _read_chunks(self, doc_id: str, metadata: Dict[str, Any]) -> pa.Array:
+        """
+        Read a document's chunks as one contiguous Arrow string array.
+        
+        The IPC file is memory-mapped, so chunk text is sliced straight out of
+        the page cache. Stores written before the Arrow format keep their
+        chunks inline in the JSON metadata.
+        """
+        chunks_path = self._get_chunks_path(doc_id)
+        if not chunks_path.exists():
+            return pa.array(metadata['chunks'], type=pa.large_string())
+        
+        table = pa.ipc.open_file(pa.memory_map(str(chunks_path))).read_all()
+        return table.column('chunk').combine_chunks()
+    
+    def _embed_queries(self, queries: List[str]) -> np.ndarray:
+        """
+        Embed search queries, reusing cached vectors when available.
+        
+        Cache misses are sent to the embeddings API in batches of
+        EMBED_BATCH_SIZE. Returns a float32 array of shape (n, d).
+        """
+        vectors = [self.query_cache.get(query) for query in queries]
+        misses = [i for i, vector in enumerate(vectors) if vector is None]
+        
+        if len(misses) == 1:
+            query = queries[misses[0]]
+            vectors[misses[0]] = np.asarray(self.embeddings.embed_query(query), dtype='float32')
+            self.query_cache.set(query, vectors[misses[0]])
+        elif misses:
+            for start in range(0, len(misses), self.EMBED_BATCH_SIZE):
+                batch = misses[start:start + self.EMBED_BATCH_SIZE]
+                embedded = self.embeddings.embed_documents([queries[i] for i in batch])
+                for i, vector in zip(batch, embedded):
+                    vectors[i] = np.asarray(vector, dtype='float32')
+                    self.query_cache.set(queries[i], vectors[i])
+        
+        return np.vstack(vectors)
+    
+    def _embed_chunks(self, chunks: List[str]) -> np.ndarray:
+        """
+        Embed document chunks, sending EMBED_BATCH_SIZE batches concurrently.
+        
+        Returns a float32 array of shape (n, d) in chunk order.
+        """
+        batches = [
+            chunks[start:start + self.EMBED_BATCH_SIZE]
+            for start in range(0, len(chunks), self.EMBED_BATCH_SIZE)
+        ]
+        if len(batches) == 1:
+            return np.array(self.embeddings.embed_documents(chunks), dtype='float32')
+        
+        async def embed_all():
+            semaphore = asyncio.Semaphore(self.EMBED_CONCURRENCY)
+            
+            async def embed_batch(batch):
+                async with semaphore:
+                    return await self.embeddings.aembed_documents(batch)
+            
+            return await asyncio.gather(*(embed_batch(batch) for batch in batches))
+        
+        embedded = asyncio.run(embed_all())
+        return np.array([vector for batch in embedded for vector in batch], dtype='float32')
+    
+    def _fast_split(self, text: str) -> List[str]:
+        """
+        Split text into overlapping chunks in a single pass.
+        
+        Candidate break points (paragraph, line, sentence and word
+        boundaries) are found with one regex scan; each chunk then ends at
+        the last break point that fits within CHUNK_SIZE.
+        
+        Args:
+            text: Full text to split
+            
+        Returns:
+            List of chunk strings
+        """
+        offsets = [m.end() for m in self.SPLIT_POINTS.finditer(text)]
+        length = len(text)
+        chunks = []
+        start = 0
+        
+        while start < length:
+            limit = start + self.CHUNK_SIZE
+            if limit >= length:
+                end = length
+            else:
+                i = bisect_right(offsets, limit) - 1
+                end = offsets[i] if i >= 0 and offsets[i] > start else limit
+            
+            chunk = text[start:end].strip()
+            if chunk:
+                chunks.append(chunk)
+            if end >= length:
+                break
+            
+            # Step back for overlap, starting the next chunk on a break point
+            next_start = end - self.CHUNK_OVERLAP
+            j = bisect_left(offsets, next_start)
+            if j < len(offsets) and offsets[j] < end:
+                next_start = offsets[j]
+            start = next_start if next_start > start else end
+        
+        return chunks
+    
+    def _split_text(self, text: str) -> List[str]:
+        """Split document text into chunks for embedding."""
+        if self.USE_FAST_SPLITTER:
+            return self._fast_split(text)
+        return self.text_splitter.split_text(text)
+    
+    @classmethod
+    def _ensure_hot_state(cls) -> None:
+        """Reset the hot cache and writer pool if we are in a forked child."""
+        pid = os.getpid()
+        if cls._hot_pid == pid:
+            return
+        with _hot_reset_lock:
+            if cls._hot_pid != pid:
+                cls._hot = OrderedDict()
+                cls._pending = {}
+                cls._hot_lock = threading.Lock()
+                cls._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='faiss-writer')
+                cls._hot_pid = pid
+    
+    def _remember(self, doc_id: str, doc: _IndexedDocument) -> None:
+        """Put a document into the hot cache, evicting the least recently used."""
+        self._ensure_hot_state()
+        with self._hot_lock:
+            self._hot[doc_id] = doc
+            self._hot.move_to_end(doc_id)
+            while len(self._hot) > self.HOT_CACHE_SIZE:
+                self._hot.popitem(last=False)
+    
+    def _load(self, doc_id: str) -> Optional[_IndexedDocument]:
+        """
+        Get a document's index and chunks, preferring the hot cache.
+        
+        Returns:
+            _IndexedDocument, or None if the document is not indexed
+        """
+        self._ensure_hot_state()
+        with self._hot_lock:
+            entry = self._hot.get(doc_id)
+            if entry is not None:
+                self._hot.move_to_end(doc_id)
+                return entry
+        
+        index_path = self._get_index_path(doc_id)
+        metadata_path = self._get_metadata_path(doc_id)
+        if not index_path.exists() or not metadata_path.exists():
+            return None
+        
+        index = faiss.read_index(str(index_path))
+        with open(metadata_path, 'r', encoding='utf-8') as f:
+            metadata = json.load(f)
+        
+        if 'ef_search' in metadata and hasattr(index, 'hnsw'):
+            index.hnsw.efSearch = metadata['ef_search']
+        
+        chunks = self._read_chunks(doc_id, metadata)
+        
+        bm25 = None
+        bm25_path = self._get_bm25_path(doc_id)
+        if bm25_path.exists():
+            with open(bm25_path, 'rb') as f:
+                bm25 = pickle.load(f)
+        
+        doc = _IndexedDocument(index, chunks, bm25, metadata.get('int8_scale'))
+        self._remember(doc_id, doc)
+        return doc
+    
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        """L2-normalize each row."""
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+    
+    def _quantize(self, embeddings_array: np.ndarray):
+        """
+        Quantize chunk embeddings to 8-bit codes for QT_8bit_direct.
+        
+        Rows are L2-normalized and scaled by one document-wide factor so the
+        largest component maps to +/-127, then offset into [1, 255].
+        
+        Returns:
+            ((n, d) uint8 codes, scale)
+        """
+        unit = self._normalize(embeddings_array)
+        scale = 127.0 / max(float(np.abs(unit).max()), 1e-12)
+        codes = np.clip(np.rint(unit * scale), -127, 127).astype(np.int16) + 128
+        return codes.astype(np.uint8), scale
+    
+    def _prepare_queries(self, query_array: np.ndarray, int8_scale: Optional[float]) -> np.ndarray:
+        """Map fp32 query embeddings into the space of an int8 index."""
+        if int8_scale is None:
+            return query_array
+        return (self._normalize(query_array) * int8_scale + 128).astype('float32')
+    
+    def _build_index(self, embeddings_array: np.ndarray):
+        """
+        Build an 8-bit FAISS index sized to the document.
+        
+        QT_8bit_direct stores codes verbatim, so no quantizer training pass
+        is needed; flat indices take the codes without an fp32 copy.
+        
+        Args:
+            embeddings_array: (n, d) float32 chunk embeddings
+            
+        Returns:
+            (populated FAISS index, int8 scale)
+        """
+        dimension = embeddings_array.shape[1]
+        codes, scale = self._quantize(embeddings_array)
+        
+        if len(codes) < self.HNSW_MIN_CHUNKS:
+            index = faiss.IndexScalarQuantizer(
+                dimension, faiss.ScalarQuantizer.QT_8bit_direct
+            )
+            index.add_sa_codes(codes)
+        else:
+            index = faiss.IndexHNSWSQ(
+                dimension, faiss.ScalarQuantizer.QT_8bit_direct, self.HNSW_M
+            )
+            index.hnsw.efConstruction = self.HNSW_EF_CONSTRUCTION
+            index.hnsw.efSearch = self.HNSW_EF_SEARCH
+            # Graph construction needs vectors, not codes
+            index.add(codes.astype('float32'))
+        
+        return index, scale
+    
+    def _persist(self, doc_id: str, doc: _IndexedDocument) -> None:
+        """
+        Write an index, its chunks and metadata to disk.
+        
+        Each file is replaced atomically, and the metadata file, which
+        _load and document_exists look for, is written last.
+        """
+        index = doc.index
+        with _atomic_path(self._get_chunks_path(doc_id)) as tmp:
+            self._write_chunks(tmp, doc.chunks)
+        
+        if doc.bm25 is not None:
+            with _atomic_path(self._get_bm25_path(doc_id)) as tmp:
+                with open(tmp, 'wb') as f:
+                    pickle.dump(doc.bm25, f, protocol=pickle.HIGHEST_PROTOCOL)
+        
+        with _atomic_path(self._get_index_path(doc_id)) as tmp:
+            faiss.write_index(index, str(tmp))
+        
+        metadata = {
+            'chunk_count': len(doc.chunks),
+            'dimension': index.d,
+        }
+        if doc.int8_scale is not None:
+            metadata['int8_scale'] = doc.int8_scale
+        if hasattr(index, 'hnsw'):
+            # efSearch is a runtime parameter and is not stored by write_index
+            metadata['ef_search'] = index.hnsw.efSearch
+        
+        with _atomic_path(self._get_metadata_path(doc_id)) as tmp:
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(metadata, f, ensure_ascii=False)
+    
+    def wait_for_write(self, doc_id: str) -> bool:
+        """
+        Block until any background write for this document has finished.
+        
+        add_document returns before its files are on disk; other processes
+        can only load the document once this returns True.
+        
+        Returns:
+            False if the write failed
+        """
+        self._ensure_hot_state()
+        with self._hot_lock:
+            future = self._pending.get(doc_id)
+        if future is not None:
+            try:
+                future.result()
+            except Exception:
+                return False
+        return True
+    
     def add_document(self, doc_id: str, text: str) -> Dict[str, Any]:
         """
         Process document text, create embeddings, and store in FAISS.
@@ -97,7 +505,7 @@ class VectorStoreService:
         
         try:
             # Split text into chunks
-            chunks = self.text_splitter.split_text(text)
+            chunks = self._split_text(text)
             
             if not chunks:
                 return {
@@ -107,26 +515,27 @@ class VectorStoreService:
                 }
             
             # Create embeddings for all chunks
-            embeddings_list = self.embeddings.embed_documents(chunks)
-            embeddings_array = np.array(embeddings_list).astype('float32')
+            embeddings_array = self._embed_chunks(chunks)
             
             # Create FAISS index
-            dimension = embeddings_array.shape[1]
-            index = faiss.IndexFlatL2(dimension)
-            index.add(embeddings_array)
-            
-            # Save index
-            index_path = self._get_index_path(doc_id)
-            faiss.write_index(index, str(index_path))
-            
-            # Save chunks metadata
-            metadata_path = self._get_metadata_path(doc_id)
-            with open(metadata_path, 'w', encoding='utf-8') as f:
-                json.dump({
-                    'chunks': chunks,
-                    'chunk_count': len(chunks),
-                    'dimension': dimension,
-                }, f, ensure_ascii=False)
+            index, int8_scale = self._build_index(embeddings_array)
+            
+            doc = _IndexedDocument(
+                index=index,
+                chunks=pa.array(chunks, type=pa.large_string()),
+                bm25=self._build_bm25(chunks),
+                int8_scale=int8_scale,
+            )
+            
+            # Keep the fresh index in memory so the first search skips the
+            # disk round-trip, and persist it in the background
+            self._remember(doc_id, doc)
+            future = self._writer.submit(self._persist, doc_id, doc)
+            with self._hot_lock:
+                self._pending[doc_id] = future
+            future.add_done_callback(
+                lambda f, doc_id=doc_id: self._forget_pending(doc_id, f)
+            )
             
             return {
                 'success': True,
@@ -141,6 +550,13 @@ class VectorStoreService:
                 'error': str(e),
             }
     
+    @classmethod
+    def _forget_pending(cls, doc_id: str, future: Future) -> None:
+        """Drop a finished background write from the pending map."""
+        with cls._hot_lock:
+            if cls._pending.get(doc_id) is future:
+                del cls._pending[doc_id]
+    
     def search(
         self, 
         doc_id: str, 
@@ -158,85 +574,178 @@ class VectorStoreService:
         Returns:
             Dictionary with 'chunks', 'scores', 'success', 'error'
         """
-        if not self.embeddings:
+        result = self.search_many(doc_id, [query], top_k=top_k)
+        
+        if not result['success']:
             return {
                 'chunks': [],
                 'scores': [],
                 'success': False,
+                'error': result['error'],
+            }
+        
+        return {
+            'chunks': result['results'][0]['chunks'],
+            'scores': result['results'][0]['scores'],
+            'success': True,
+            'error': None,
+        }
+    
+    def search_many(
+        self,
+        doc_id: str,
+        queries: List[str],
+        top_k: int = 5
+    ) -> Dict[str, Any]:
+        """
+        Search a document for several queries with one batched FAISS call.
+        
+        Useful for multi-query retrieval or sub-question decomposition.
+        
+        Args:
+            doc_id: Document identifier
+            queries: Search queries
+            top_k: Number of top results to return per query
+            
+        Returns:
+            Dictionary with 'results' (one {'chunks', 'scores'} dict per
+            query, in order), 'success', 'error'
+        """
+        if not self.embeddings:
+            return {
+                'results': [],
+                'success': False,
                 'error': 'Embeddings model not configured.',
             }
         
         try:
-            index_path = self._get_index_path(doc_id)
-            metadata_path = self._get_metadata_path(doc_id)
+            loaded = self._load(doc_id)
             
-            if not index_path.exists() or not metadata_path.exists():
+            if loaded is None:
                 return {
-                    'chunks': [],
-                    'scores': [],
+                    'results': [],
                     'success': False,
                     'error': f'Document index not found for: {doc_id}',
                 }
             
-            # Load index and metadata
-            index = faiss.read_index(str(index_path))
-            with open(metadata_path, 'r', encoding='utf-8') as f:
-                metadata = json.load(f)
+            index, chunks, bm25 = loaded.index, loaded.chunks, loaded.bm25
             
-            chunks = metadata['chunks']
-            
-            # Create query embedding
-            query_embedding = self.embeddings.embed_query(query)
-            query_array = np.array([query_embedding]).astype('float32')
+            # Create query embeddings as a single (n, d) matrix
+            query_array = self._prepare_queries(
+                self._embed_queries(queries), loaded.int8_scale
+            )
             
-            # Search
             k = min(top_k, len(chunks))
-            distances, indices = index.search(query_array, k)
+            if bm25 is None:
+                # Search all queries at once
+                distances, indices = index.search(query_array, k)
+            else:
+                distances, indices = self._search_prefiltered(
+                    index, bm25, queries, query_array, k
+                )
             
-            # Get results
-            result_chunks = [chunks[i] for i in indices[0] if i < len(chunks)]
-            result_scores = distances[0].tolist()
+            # Get results (FAISS pads missing neighbours with -1)
+            results = []
+            for dist_row, row in zip(distances, indices):
+                hits = [(i, d) for i, d in zip(row, dist_row) if 0 <= i < len(chunks)]
+                results.append({
+                    'chunks': chunks.take([int(i) for i, _ in hits]).to_pylist(),
+                    'scores': [float(d) for _, d in hits],
+                })
             
             return {
-                'chunks': result_chunks,
-                'scores': result_scores,
+                'results': results,
                 'success': True,
                 'error': None,
             }
             
         except Exception as e:
             return {
-                'chunks': [],
-                'scores': [],
+                'results': [],
                 'success': False,
                 'error': str(e),
             }
     
-    def get_all_chunks(self, doc_id: str) -> Dict[str, Any]:
+    def _search_prefiltered(self, index, bm25, queries, query_array, k):
+        """
+        Rank each query's BM25 candidates by embedding distance.
+        
+        Flat indices are searched with an IDSelector over the candidates.
+        An HNSW graph walk restricted to a few hundred of its ids finds few
+        of them, so for HNSW the candidates are ranked exactly instead.
+        
+        Returns:
+            (distances, indices) arrays shaped like index.search output
+        """
+        distances = np.full((len(queries), k), np.inf, dtype='float32')
+        indices = np.full((len(queries), k), -1, dtype='int64')
+        
+        for row, query in enumerate(queries):
+            candidates = self._bm25_candidates(bm25, query)
+            query_vector = query_array[row:row + 1]
+            
+            if candidates is None:
+                dist, ids = index.search(query_vector, k)
+            elif hasattr(index, 'hnsw'):
+                dist, ids = self._rank_candidates(index, candidates, query_vector, k)
+            else:
+                params = faiss.SearchParameters(sel=faiss.IDSelectorBatch(candidates))
+                dist, ids = index.search(query_vector, k, params=params)
+            distances[row], indices[row] = dist[0], ids[0]
+        
+        return distances, indices
+    
+    @staticmethod
+    def _rank_candidates(index, candidates, query_vector, k):
+        """
+        Exact L2 ranking of a subset of an index's vectors.
+        
+        Args:
+            index: FAISS index supporting reconstruct
+            candidates: int64 ids to rank
+            query_vector: (1, d) query in the index's space
+            k: Number of neighbours to return
+            
+        Returns:
+            (distances, indices) arrays shaped like index.search output
+        """
+        vectors = index.reconstruct_batch(candidates)
+        dist = ((vectors - query_vector) ** 2).sum(axis=1)
+        order = np.argsort(dist)[:k]
+        
+        distances = np.full((1, k), np.inf, dtype='float32')
+        indices = np.full((1, k), -1, dtype='int64')
+        distances[0, :len(order)] = dist[order]
+        indices[0, :len(order)] = candidates[order]
+        return distances, indices
+    
+    def get_all_chunks(self, doc_id: str, limit: Optional[int] = None) -> Dict[str, Any]:
         """
         Get all chunks for a document (for complete context).
         
         Args:
             doc_id: Document identifier
+            limit: Only materialize the first N chunks
             
         Returns:
             Dictionary with 'chunks', 'success', 'error'
         """
         try:
-            metadata_path = self._get_metadata_path(doc_id)
+            loaded = self._load(doc_id)
             
-            if not metadata_path.exists():
+            if loaded is None:
                 return {
                     'chunks': [],
                     'success': False,
                     'error': f'Document not found: {doc_id}',
                 }
             
-            with open(metadata_path, 'r', encoding='utf-8') as f:
-                metadata = json.load(f)
+            chunks = loaded.chunks
+            if limit is not None:
+                chunks = chunks.slice(0, limit)
             
             return {
-                'chunks': metadata['chunks'],
+                'chunks': chunks.to_pylist(),
                 'success': True,
                 'error': None,
             }
@@ -271,9 +780,7 @@ class VectorStoreService:
         if query:
             result = self.search(doc_id, query, top_k=max_chunks)
         else:
-            result = self.get_all_chunks(doc_id)
-            if result['success']:
-                result['chunks'] = result['chunks'][:max_chunks]
+            result = self.get_all_chunks(doc_id, limit=max_chunks)
         
         if not result['success'] or not result['chunks']:
             return ""
@@ -291,18 +798,48 @@ class VectorStoreService:
             True if deleted, False otherwise
         """
         try:
-            index_path = self._get_index_path(doc_id)
-            metadata_path = self._get_metadata_path(doc_id)
+            self._ensure_hot_state()
+            with self._hot_lock:
+                self._hot.pop(doc_id, None)
+            
+            # Let an in-flight write land before removing its files
+            self.wait_for_write(doc_id)
             
-            if index_path.exists():
-                index_path.unlink()
-            if metadata_path.exists():
-                metadata_path.unlink()
+            # Metadata first, so other processes stop loading the document
+            for path in (
+                self._get_metadata_path(doc_id),
+                self._get_index_path(doc_id),
+                self._get_chunks_path(doc_id),
+                self._get_bm25_path(doc_id),
+            ):
+                if path.exists():
+                    path.unlink()
             
             return True
         except Exception:
             return False
     
     def document_exists(self, doc_id: str) -> bool:
-        """Check if a document has been indexed."""
-        return self._get_index_path(doc_id).exists()
+        """
+        Check if a document has been indexed.
+        
+        A write pending in this process counts. On disk, the metadata file
+        is written last and deleted first, so it only exists while the
+        whole set of files does.
+        """
+        self._ensure_hot_state()
+        with self._hot_lock:
+            if doc_id in self._hot or doc_id in self._pending:
+                return True
+        return self._get_metadata_path(doc_id).exists()
+
+
+@lru_cache(maxsize=1)
+def get_vector_store() -> VectorStoreService:
+    """
+    Shared VectorStoreService for this process.
+    
+    Avoids rebuilding the embeddings client, text splitter and query cache
+    on every request. The service keeps no per-request state.
+    """
+    return VectorStoreService()
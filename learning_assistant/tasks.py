@@ -0,0 +1,586 @@
+"""
+Learning Assistant Background Tasks
+
+Generation work that runs outside the request cycle via
+services.jobs.enqueue_job. Each task returns the same result dict the
+corresponding view used to return inline.
+"""
+
+import time
+import logging
+import datetime
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+
+from .models import (
+    Document, Summary, Quiz, QuizQuestion, FlashcardSet, Flashcard,
+    Flowchart, FlowchartNode, FlowchartEdge,
+)
+from .agents import get_agent
+from .services import get_document_processor, get_vector_store, response_cache
+
+
+logger = logging.getLogger(__name__)
+
+# Seconds to skip Gemini context caching after a failed create; quota and
+# unsupported-model errors would otherwise be retried on every summary
+CONTEXT_CACHE_RETRY_AFTER = 10 * 60
+
+
+def extract_document_task(document_id):
+    """
+    Extract and store the text of an uploaded document.
+
+    Documents whose text cannot be extracted are deleted along with their
+    file, matching the old behaviour of rejecting the upload.
+
+    Args:
+        document_id: Document primary key
+
+    Returns:
+        Dictionary with 'success', 'document', 'error'
+    """
+    document = Document.objects.get(id=document_id)
+
+    processor = get_document_processor()
+    extraction_result = processor.extract_text_from_path(
+        document.file.path, name=Path(document.file.name).name
+    )
+
+    if not extraction_result['success']:
+        document.file.delete(save=False)
+        document.delete()
+        return {
+            'success': False,
+            'error': extraction_result['error'],
+        }
+
+    document.extracted_text = extraction_result['text']
+    document.text_hash = Document.hash_text(document.extracted_text)
+    document.chars_per_token = _measure_chars_per_token(document.extracted_text)
+    document.text_len = len(document.extracted_text)
+    document.page_count = extraction_result.get('page_count', 1)
+    document.save(update_fields=[
+        'extracted_text', 'text_hash', 'chars_per_token', 'text_len', 'page_count',
+        'updated_at',
+    ])
+
+    # Note: Skipping FAISS indexing to save API quota
+    # The raw extracted text will be used directly for generation
+    # FAISS can be enabled later for large documents by uncommenting below:
+    # vector_service = get_vector_store()
+    # index_result = vector_service.add_document(
+    #     document.vector_doc_id,
+    #     extraction_result['text']
+    # )
+    # if index_result['success']:
+    #     document.is_indexed = True
+    #     document.chunk_count = index_result['chunk_count']
+    #     document.save()
+
+    return {
+        'success': True,
+        'document': {
+            'id': str(document.id),
+            'title': document.title,
+            'file_type': document.file_type,
+            'page_count': document.page_count,
+            'is_indexed': document.is_indexed,
+        },
+        'error': None,
+    }
+
+
+def _measure_chars_per_token(text: str):
+    """Characters per Gemini token in text, or None if it cannot be counted."""
+    if not text:
+        return None
+    try:
+        tokens = get_agent('summary').count_tokens(text)
+    except Exception:
+        logger.warning('Could not count tokens; context budgets will be estimated', exc_info=True)
+        return None
+    return len(text) / tokens if tokens else None
+
+
+def cleanup_document_task(vector_doc_id: str, file_name: str, attempts: int = 3):
+    """
+    Remove a deleted document's vector index and uploaded file.
+
+    Both steps are idempotent, so failures are retried with backoff.
+
+    Args:
+        vector_doc_id: Document.vector_doc_id of the deleted document
+        file_name: Storage name of its uploaded file ('' if none)
+        attempts: Tries before giving up
+    """
+    for attempt in range(attempts):
+        try:
+            if not get_vector_store().delete_document(vector_doc_id):
+                raise RuntimeError(f'Could not delete vector index {vector_doc_id}')
+            if file_name:
+                default_storage.delete(file_name)
+            return
+        except Exception:
+            if attempt == attempts - 1:
+                raise
+            logger.warning('Cleanup of document %s failed, retrying', vector_doc_id)
+            time.sleep(2 ** attempt)
+
+
+def generate_summary_task(document_id, summary_type: str):
+    """
+    Generate and save a summary for a document.
+
+    Uses the extracted text directly (saves API quota vs FAISS embeddings).
+    Long documents are summarized in parts rather than truncated.
+
+    Args:
+        document_id: Document primary key
+        summary_type: One of Summary.SUMMARY_TYPE_CHOICES
+
+    Returns:
+        Dictionary with 'success', 'summary', 'error'
+    """
+    document = Document.objects.get(id=document_id)
+    context = document.extracted_text
+    context_hash = document.text_hash
+
+    start_time = time.time()
+    agent = get_agent('summary')
+
+    def generate():
+        total_tokens = document.count_tokens(context, agent)
+
+        if total_tokens > settings.SUMMARY_MAX_CONTEXT_TOKENS:
+            # Too long for one call: summarize in parts and merge. The partial
+            # summaries stay in memory; only the merged result is saved below.
+            return agent.generate_map_reduce(
+                context, summary_type=summary_type, total_tokens=total_tokens
+            )
+
+        cache_name = _get_context_cache(document, agent, context, context_hash)
+        try:
+            return agent.generate_sync(
+                context, summary_type=summary_type, cached_content=cache_name
+            )
+        except Exception:
+            if not cache_name:
+                raise
+            # The cached content may have been evicted early; send inline instead
+            return agent.generate_sync(context, summary_type=summary_type)
+
+    result = response_cache.get_or_generate(
+        _cache_kind(agent), {'summary_type': summary_type}, context_hash, generate
+    )
+    generation_time = time.time() - start_time
+
+    if not result.get('success'):
+        return {
+            'success': False,
+            'error': result.get('error', 'Failed to generate summary'),
+        }
+
+    return save_summary(document, agent, summary_type, result, generation_time)
+
+
+def cached_summary_result(document, agent, summary_type: str):
+    """
+    Look up a summary result generate_summary_task cached for this text.
+
+    Returns:
+        The agent result dict, or None on a miss
+    """
+    return response_cache.get(response_cache.make_key(
+        _cache_kind(agent), {'summary_type': summary_type}, document.text_hash
+    ))
+
+
+def stream_summary(document, agent, context: str, summary_type: str):
+    """
+    Stream a single-call summary, sharing generate_summary_task's caches.
+
+    The context goes through the document's Gemini context cache when one
+    can be used. Once the summary is complete it is stored in the response
+    cache, so a later job for the same text reuses it.
+
+    Yields:
+        Text deltas, in order
+    """
+    cache_name = _get_context_cache(document, agent, context, document.text_hash)
+    parts = []
+    deltas = agent.generate_stream(
+        context, summary_type=summary_type, cached_content=cache_name
+    )
+    try:
+        for delta in deltas:
+            parts.append(delta)
+            yield delta
+    except Exception:
+        if not cache_name or parts:
+            raise
+        # The cached content may have been evicted early; send inline instead
+        for delta in agent.generate_stream(context, summary_type=summary_type):
+            parts.append(delta)
+            yield delta
+
+    summary = ''.join(parts)
+    response_cache.set(
+        response_cache.make_key(
+            _cache_kind(agent), {'summary_type': summary_type}, document.text_hash
+        ),
+        {
+            'summary': summary,
+            'type': summary_type,
+            'word_count': agent.count_words(summary),
+            'success': True,
+        },
+    )
+
+
+def save_summary(document, agent, summary_type: str, result, generation_time: float):
+    """
+    Save a generated summary and build the payload the summary views return.
+
+    Args:
+        document: Document the summary belongs to
+        agent: Summary agent that produced it
+        summary_type: One of Summary.SUMMARY_TYPE_CHOICES
+        result: Summary agent result dict
+        generation_time: Seconds spent generating
+
+    Returns:
+        Dictionary with 'success', 'summary', 'error'
+    """
+    summary = Summary.objects.create(
+        document=document,
+        content=result['summary'],
+        summary_type=summary_type,
+        word_count=result.get('word_count', 0),
+        context_hash=document.text_hash,
+        model_used=agent.model_name,
+        generation_time=generation_time,
+    )
+
+    return {
+        'success': True,
+        'summary': {
+            'id': str(summary.id),
+            'content': summary.content,
+            'type': summary.summary_type,
+            'word_count': summary.word_count,
+            'generation_time': round(generation_time, 2),
+        },
+        'error': None,
+    }
+
+
+def _load_context(document_id, max_tokens: int = None):
+    """
+    Load a document and its text, clipped to max_tokens for generation.
+
+    Args:
+        document_id: Document primary key
+        max_tokens: Context budget (default: GENERATION_CONTEXT_TOKENS)
+
+    Returns:
+        (document, context, context_hash). The clipped context is fully
+        determined by the stored text and its character budget, so its
+        cache identity is derived from text_hash instead of hashing the
+        context again.
+    """
+    max_tokens = max_tokens or settings.GENERATION_CONTEXT_TOKENS
+
+    # The database sends only the prefix; one extra char tells us it was cut
+    document = Document.objects.defer('extracted_text').annotate(
+        **Document.context_annotations(max_tokens)
+    ).get(id=document_id)
+    context = document.clipped_context()
+    return document, context, f"{document.text_hash}:{document.context_chars}"
+
+
+def _generate_cached(agent, context: str, context_hash: str, **params):
+    """Call agent.generate_sync(context, **params) through the response cache."""
+    return response_cache.get_or_generate(
+        _cache_kind(agent), params, context_hash,
+        lambda: agent.generate_sync(context, **params),
+    )
+
+
+def _cache_kind(agent) -> str:
+    """Response cache namespace for an agent; a model change starts afresh."""
+    return f"{agent.AGENT_NAME}:{agent.model_name}"
+
+
+def generate_quiz_task(document_id, difficulty: str, question_count: int):
+    """
+    Generate and save a quiz for a document.
+
+    Args:
+        document_id: Document primary key
+        difficulty: One of Quiz.DIFFICULTY_CHOICES
+        question_count: Number of questions to request
+
+    Returns:
+        Dictionary with 'success', 'quiz', 'error'
+    """
+    document, context, context_hash = _load_context(document_id)
+
+    start_time = time.time()
+    agent = get_agent('quiz')
+    result = _generate_cached(
+        agent, context, context_hash,
+        difficulty=difficulty,
+        question_count=question_count
+    )
+    generation_time = time.time() - start_time
+
+    if not result.get('success'):
+        return {
+            'success': False,
+            'error': result.get('error', 'Failed to generate quiz'),
+        }
+
+    # Create quiz and questions (one INSERT for all questions)
+    with transaction.atomic():
+        quiz = Quiz.objects.create(
+            document=document,
+            user_id=document.user_id,
+            title=f"Quiz on {document.title}",
+            difficulty=difficulty,
+            question_count=len(result['questions']),
+            model_used=agent.model_name,
+            generation_time=generation_time,
+        )
+
+        QuizQuestion.objects.bulk_create([
+            QuizQuestion(
+                quiz=quiz,
+                question_text=q_data['question'],
+                option_a=q_data['option_a'],
+                option_b=q_data['option_b'],
+                option_c=q_data['option_c'],
+                option_d=q_data['option_d'],
+                correct_answer=q_data['correct_answer'],
+                explanation=q_data.get('explanation', ''),
+                order=q_data.get('order', 0),
+            )
+            for q_data in result['questions']
+        ])
+
+    return {
+        'success': True,
+        'quiz': {
+            'id': str(quiz.id),
+            'title': quiz.title,
+            'difficulty': quiz.difficulty,
+            'question_count': quiz.question_count,
+        },
+        'error': None,
+    }
+
+
+def generate_flashcards_task(document_id, card_count: int):
+    """
+    Generate and save a flashcard set for a document.
+
+    Args:
+        document_id: Document primary key
+        card_count: Number of cards to request
+
+    Returns:
+        Dictionary with 'success', 'flashcard_set', 'error'
+    """
+    document, context, context_hash = _load_context(document_id)
+
+    start_time = time.time()
+    agent = get_agent('flashcard')
+    result = _generate_cached(
+        agent, context, context_hash,
+        card_count=card_count
+    )
+    generation_time = time.time() - start_time
+
+    if not result.get('success'):
+        return {
+            'success': False,
+            'error': result.get('error', 'Failed to generate flashcards'),
+        }
+
+    # Create flashcard set and cards (one INSERT for all cards)
+    with transaction.atomic():
+        flashcard_set = FlashcardSet(
+            document=document,
+            user_id=document.user_id,
+            title=f"Flashcards: {document.title}",
+            card_count=len(result['flashcards']),
+            model_used=agent.model_name,
+            generation_time=generation_time,
+        )
+
+        cards = [
+            Flashcard(
+                flashcard_set=flashcard_set,
+                front=card_data['front'],
+                back=card_data['back'],
+                priority=card_data.get('priority', 3),
+                order=card_data.get('order', 0),
+            )
+            for card_data in result['flashcards']
+        ]
+
+        # Serialize for the study page up front, in Flashcard.Meta.ordering
+        flashcard_set.cards_json = FlashcardSet.serialize_cards(
+            sorted(cards, key=lambda card: (card.priority, card.order))
+        )
+        flashcard_set.save()
+        Flashcard.objects.bulk_create(cards)
+
+    return {
+        'success': True,
+        'flashcard_set': {
+            'id': str(flashcard_set.id),
+            'title': flashcard_set.title,
+            'card_count': flashcard_set.card_count,
+        },
+        'error': None,
+    }
+
+
+def generate_flowchart_task(document_id, detail_level: str):
+    """
+    Generate and save the flowcharts for a document.
+
+    Args:
+        document_id: Document primary key
+        detail_level: 'simple', 'medium' or 'detailed'
+
+    Returns:
+        Dictionary with 'success', 'count', 'flowcharts', 'error'
+    """
+    document, context, context_hash = _load_context(document_id)
+
+    start_time = time.time()
+    agent = get_agent('flowchart')
+    result = _generate_cached(
+        agent, context, context_hash,
+        detail_level=detail_level
+    )
+    generation_time = time.time() - start_time
+
+    if not result.get('success'):
+        return {
+            'success': False,
+            'error': result.get('error', 'Failed to generate flowcharts'),
+        }
+
+    created_flowcharts = []
+    flowcharts = []
+    nodes = []
+    edges = []
+
+    # Build every flowchart with its nodes and edges in memory (ids are
+    # client-side UUIDs), then write each model in one INSERT
+    with transaction.atomic():
+        for fc_data in result.get('flowcharts', []):
+            flowchart = Flowchart(
+                document=document,
+                user_id=document.user_id,
+                title=fc_data.get('title', f"Flowchart: {document.title}"),
+                description=fc_data.get('description', ''),
+                node_count=fc_data.get('node_count', 0),
+                edge_count=fc_data.get('edge_count', 0),
+                model_used=agent.model_name,
+                generation_time=generation_time,
+            )
+            flowcharts.append(flowchart)
+
+            fc_nodes = [
+                FlowchartNode(
+                    flowchart=flowchart,
+                    node_id=node_data['id'],
+                    label=node_data['label'],
+                    node_type=node_data['type'],
+                    order=i,
+                )
+                for i, node_data in enumerate(fc_data['nodes'])
+            ]
+            fc_edges = [
+                FlowchartEdge(
+                    flowchart=flowchart,
+                    from_node=edge_data['from'],
+                    to_node=edge_data['to'],
+                    label=edge_data.get('label', ''),
+                )
+                for edge_data in fc_data['edges']
+            ]
+            nodes.extend(fc_nodes)
+            edges.extend(fc_edges)
+
+            # Serialize for the viewer up front
+            flowchart.graph_json = Flowchart.serialize_graph(fc_nodes, fc_edges)
+
+            created_flowcharts.append({
+                'id': str(flowchart.id),
+                'title': flowchart.title,
+                'node_count': flowchart.node_count
+            })
+
+        Flowchart.objects.bulk_create(flowcharts)
+        FlowchartNode.objects.bulk_create(nodes)
+        FlowchartEdge.objects.bulk_create(edges)
+
+    return {
+        'success': True,
+        'count': len(created_flowcharts),
+        'flowcharts': created_flowcharts,
+        'error': None,
+    }
+
+
+def _get_context_cache(document, agent, context: str, context_hash: str):
+    """
+    Reuse or create the Gemini context cache for a document's summary context.
+
+    Caching is best-effort: any failure falls back to sending the context
+    inline.
+
+    Returns:
+        Cache name, or None to generate without a cache
+    """
+    # Leave headroom so the cache does not expire mid-request
+    fresh_until = timezone.now() + datetime.timedelta(minutes=2)
+    if (
+        document.gemini_cache_name
+        and document.gemini_cache_hash == context_hash
+        and document.gemini_cache_expires_at
+        and document.gemini_cache_expires_at > fresh_until
+    ):
+        return document.gemini_cache_name
+
+    failed_key = f'gemini-context-cache-failed:{agent.model_name}'
+    if cache.get(failed_key):
+        return None
+
+    try:
+        created = agent.create_context_cache(context)
+    except Exception:
+        logger.exception('Could not create context cache for document %s', document.id)
+        cache.set(failed_key, True, CONTEXT_CACHE_RETRY_AFTER)
+        return None
+
+    if not created:
+        return None
+
+    cache_name, expires_at = created
+    Document.objects.filter(id=document.id).update(
+        gemini_cache_name=cache_name,
+        gemini_cache_hash=context_hash,
+        gemini_cache_expires_at=expires_at,
+    )
+    return cache_name
@@ -1,3 +1,69 @@
-from django.test import TestCase
+import tempfile
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from django.test import SimpleTestCase
+
+from .services.vector_store import VectorStoreService
+
+
+class VectorStoreSearchTests(SimpleTestCase):
+    """Searches on documents large enough for the BM25 pre-filter."""
+
+    DIMENSION = 32
+    TOPICS = 40
+
+    def setUp(self):
+        self.store_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.store_dir.cleanup)
+        self.service = VectorStoreService(store_dir=self.store_dir.name)
+        # Embeddings are supplied by the patched _embed_* methods
+        self.service.embeddings = mock.Mock()
+
+    def _index(self, doc_id, chunk_count):
+        """Index chunk_count chunks with random embeddings."""
+        chunks = [
+            f"section {i} covers topic{i % self.TOPICS} in detail"
+            for i in range(chunk_count)
+        ]
+        embeddings = np.random.default_rng(0).standard_normal(
+            (chunk_count, self.DIMENSION)
+        ).astype('float32')
+
+        with mock.patch.object(self.service, '_split_text', return_value=chunks), \
+                mock.patch.object(self.service, '_embed_chunks', return_value=embeddings):
+            result = self.service.add_document(doc_id, 'unused')
+
+        self.assertTrue(result['success'], result['error'])
+        return chunks, embeddings
+
+    def _search(self, doc_id, embeddings, target):
+        """Search for topic7 with the embedding of chunk target."""
+        with mock.patch.object(
+            self.service, '_embed_queries', return_value=embeddings[[target]]
+        ):
+            return self.service.search(doc_id, f'topic{target % self.TOPICS}', top_k=5)
+
+    def test_prefiltered_search_flat_and_hnsw(self):
+        sizes = (
+            VectorStoreService.BM25_MIN_CHUNKS + 500,
+            VectorStoreService.HNSW_MIN_CHUNKS + 500,
+        )
+        for chunk_count in sizes:
+            with self.subTest(chunk_count=chunk_count):
+                doc_id = f'doc-{chunk_count}'
+                chunks, embeddings = self._index(doc_id, chunk_count)
+
+                result = self._search(doc_id, embeddings, 7)
+                self.assertTrue(result['success'], result['error'])
+                self.assertEqual(len(result['chunks']), 5)
+                self.assertEqual(result['chunks'][0], chunks[7])
+                for chunk in result['chunks']:
+                    self.assertIn('topic7 ', chunk)
+
+                # Same results once the index is read back from disk
+                self.service.wait_for_write(doc_id)
+                VectorStoreService._hot.clear()
+                reloaded = self._search(doc_id, embeddings, 7)
+                self.assertTrue(reloaded['success'], reloaded['error'])
+                self.assertEqual(reloaded['chunks'], result['chunks'])
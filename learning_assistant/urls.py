@@ -7,13 +7,17 @@ urlpatterns = [
     # AI Summary
     path('summaries/', views.summaries, name='summaries'),
     path('api/upload/', views.upload_document, name='upload_document'),
+    path('api/upload/status/<uuid:job_id>/', views.upload_status, name='upload_status'),
     path('api/generate-summary/', views.generate_summary, name='generate_summary'),
+    path('api/summary/status/<uuid:job_id>/', views.summary_status, name='summary_status'),
+    path('api/summary/stream/', views.generate_summary_stream, name='generate_summary_stream'),
     path('document/<uuid:document_id>/', views.document_detail, name='document_detail'),
     path('api/document/<uuid:document_id>/delete/', views.delete_document, name='delete_document'),
     
     # Quiz
     path('quizzes/', views.quizzes, name='quizzes'),
     path('api/generate-quiz/', views.generate_quiz, name='generate_quiz'),
+    path('api/quiz/status/<uuid:job_id>/', views.quiz_status, name='quiz_status'),
     path('quiz/<uuid:quiz_id>/', views.take_quiz, name='take_quiz'),
     path('api/quiz/<uuid:quiz_id>/submit/', views.submit_quiz, name='submit_quiz'),
     path('quiz/<uuid:quiz_id>/result/', views.quiz_result, name='quiz_result'),
@@ -21,12 +25,14 @@ urlpatterns = [
     # Flashcards
     path('flashcards/', views.flashcards, name='flashcards'),
     path('api/generate-flashcards/', views.generate_flashcards, name='generate_flashcards'),
+    path('api/flashcards/status/<uuid:job_id>/', views.flashcards_status, name='flashcards_status'),
     path('flashcards/<uuid:set_id>/study/', views.study_flashcards, name='study_flashcards'),
     path('api/flashcard/<uuid:card_id>/toggle-mastery/', views.toggle_flashcard_mastery, name='toggle_flashcard_mastery'),
     
     # Flowcharts
     path('flowcharts/', views.flowcharts, name='flowcharts'),
     path('api/generate-flowchart/', views.generate_flowchart, name='generate_flowchart'),
+    path('api/flowchart/status/<uuid:job_id>/', views.flowchart_status, name='flowchart_status'),
     path('flowchart/<uuid:flowchart_id>/', views.view_flowchart, name='view_flowchart'),
     
     # Answer Sheet Evaluation
@@ -49,5 +55,6 @@ urlpatterns = [
     path('chatbot/session/<uuid:session_id>/', views.chatbot_session, name='chatbot_session'),
     path('api/chatbot/new-session/', views.create_chat_session, name='create_chat_session'),
     path('api/chatbot/send-message/', views.send_chat_message, name='send_chat_message'),
+    path('api/chatbot/send-message/stream/', views.send_chat_message_stream, name='send_chat_message_stream'),
     path('api/chatbot/session/<uuid:session_id>/delete/', views.delete_chat_session, name='delete_chat_session'),
 ]
@@ -5,18 +5,56 @@ Views for the main learning features: Summary, Quiz, Flashcards, Flowcharts, Eva
 """
 
 import json
+import re
 import time
+import uuid
+import hashlib
+import logging
+import threading
+import orjson
 from django.shortcuts import render, redirect, get_object_or_404
-from django.http import JsonResponse
-from django.views.decorators.http import require_http_methods
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.views.decorators.http import require_http_methods, condition
+from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Case, CharField, Count, F, OuterRef, Subquery, Value, When
+from django.db.models.functions import Coalesce, Concat, Length, Substr
+from django.db.models.lookups import GreaterThan
+from django.middleware.csrf import get_token
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 
-from .models import Document, Summary, Quiz, QuizQuestion, FlashcardSet, Flashcard, Flowchart, FlowchartNode, FlowchartEdge, AnswerSheetEvaluation, EvaluatedQuestion, Podcast, ChatSession, ChatMessage
-from .services import DocumentProcessor, VectorStoreService
+from .models import Document, Summary, GenerationJob, Quiz, QuizQuestion, FlashcardSet, Flashcard, Flowchart, AnswerSheetEvaluation, EvaluatedQuestion, Podcast, ChatSession, ChatMessage
+from accounts.models import UserProfile
+from .services import get_document_processor, get_vector_store, enqueue_job, expire_stale_job, run_in_background
 from .agents import get_agent
+from .middleware import max_json_body_size
+from .tasks import (
+    generate_summary_task, extract_document_task, generate_quiz_task,
+    generate_flashcards_task, generate_flowchart_task, cleanup_document_task,
+    cached_summary_result, save_summary, stream_summary,
+)
+
+
+logger = logging.getLogger(__name__)
+
+def json_response(data, status=200):
+    """
+    JSON response serialized with orjson.
+    
+    Drop-in for JsonResponse on this module's dict payloads; UUIDs and
+    datetimes are encoded natively.
+    """
+    return HttpResponse(
+        orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS),
+        content_type='application/json',
+        status=status,
+    )
 
 
 def home(request):
@@ -24,14 +62,35 @@ def home(request):
     return render(request, 'pages/home.html')
 
 
+DOCUMENTS_PER_PAGE = 10
+
+# Columns document lists render; never load extracted_text for a list
+DOCUMENT_LIST_FIELDS = ('id', 'title', 'file_type', 'page_count', 'is_indexed', 'created_at')
+
+
 @login_required
 def summaries(request):
     """AI Summary hub - upload documents and generate learning materials"""
-    # Get user's documents
-    documents = Document.objects.filter(user=request.user).order_by('-created_at')[:10]
+    # Get user's documents; the list only needs a few light columns
+    documents = Document.objects.filter(user=request.user).only(
+        *DOCUMENT_LIST_FIELDS
+    ).order_by('-created_at')
+    
+    # Keyset pagination: ?before=<created_at of the last document shown>
+    try:
+        before = parse_datetime(request.GET.get('before', ''))
+    except ValueError:
+        before = None
+    if before:
+        documents = documents.filter(created_at__lt=before)
+    
+    documents = list(documents[:DOCUMENTS_PER_PAGE + 1])
+    has_more = len(documents) > DOCUMENTS_PER_PAGE
+    documents = documents[:DOCUMENTS_PER_PAGE]
     
     context = {
         'documents': documents,
+        'next_before': documents[-1].created_at.isoformat() if has_more else None,
         'max_upload_size_mb': settings.MAX_UPLOAD_SIZE // (1024 * 1024),
         'allowed_extensions': ', '.join(settings.ALLOWED_UPLOAD_EXTENSIONS),
     }
@@ -44,7 +103,7 @@ def upload_document(request):
     """Handle document upload via AJAX"""
     try:
         if 'file' not in request.FILES:
-            return JsonResponse({
+            return json_response({
                 'success': False,
                 'error': 'No file uploaded'
             }, status=400)
@@ -54,59 +113,38 @@ def upload_document(request):
         # Validate file size
         if uploaded_file.size > settings.MAX_UPLOAD_SIZE:
             max_mb = settings.MAX_UPLOAD_SIZE // (1024 * 1024)
-            return JsonResponse({
+            return json_response({
                 'success': False,
                 'error': f'File too large. Maximum size is {max_mb}MB.'
             }, status=400)
         
         # Process the document
-        processor = DocumentProcessor()
+        processor = get_document_processor()
         file_type = processor.get_file_type(uploaded_file.name)
         
         if not file_type:
-            return JsonResponse({
+            return json_response({
                 'success': False,
                 'error': f'Unsupported file type. Allowed: {", ".join(settings.ALLOWED_UPLOAD_EXTENSIONS)}'
             }, status=400)
         
-        # Extract text
-        extraction_result = processor.extract_text(uploaded_file)
-        
-        if not extraction_result['success']:
-            return JsonResponse({
-                'success': False,
-                'error': extraction_result['error']
-            }, status=400)
-        
-        # Reset file position for saving
-        uploaded_file.seek(0)
-        
-        # Create document record
+        # Store the file now (a temporary upload is moved, not copied) and
+        # extract its text in the background
         document = Document.objects.create(
             user=request.user,
             title=request.POST.get('title', uploaded_file.name),
             file=uploaded_file,
             file_type=file_type,
             file_size=uploaded_file.size,
-            extracted_text=extraction_result['text'],
-            page_count=extraction_result.get('page_count', 1),
         )
+        _invalidate_analytics(request.user)
         
-        # Note: Skipping FAISS indexing to save API quota
-        # The raw extracted text will be used directly for generation
-        # FAISS can be enabled later for large documents by uncommenting below:
-        # vector_service = VectorStoreService()
-        # index_result = vector_service.add_document(
-        #     document.vector_doc_id,
-        #     extraction_result['text']
-        # )
-        # if index_result['success']:
-        #     document.is_indexed = True
-        #     document.chunk_count = index_result['chunk_count']
-        #     document.save()
-        
-        return JsonResponse({
+        job = enqueue_job(request.user, 'document_upload', extract_document_task, document.id)
+        
+        return json_response({
             'success': True,
+            'job_id': str(job.id),
+            'status': job.status,
             'document': {
                 'id': str(document.id),
                 'title': document.title,
@@ -114,117 +152,308 @@ def upload_document(request):
                 'page_count': document.page_count,
                 'is_indexed': document.is_indexed,
             }
-        })
+        }, status=202)
         
     except Exception as e:
-        return JsonResponse({
+        return json_response({
             'success': False,
             'error': str(e)
         }, status=500)
 
 
+@login_required
+@require_http_methods(["GET"])
+def upload_status(request, job_id):
+    """Poll a background text extraction job started by upload_document"""
+    job = get_object_or_404(GenerationJob, id=job_id, user=request.user, kind='document_upload')
+    return _job_status_response(job, 'document')
+
+
 @login_required
 @require_http_methods(["POST"])
 def generate_summary(request):
     """Generate summary for a document via AJAX"""
     try:
-        data = json.loads(request.body)
+        data = orjson.loads(request.body)
         document_id = data.get('document_id')
         summary_type = data.get('summary_type', 'detailed')
         
         if not document_id:
-            return JsonResponse({
+            return json_response({
                 'success': False,
                 'error': 'Document ID required'
             }, status=400)
         
-        # Get document
-        document = get_object_or_404(Document, id=document_id, user=request.user)
+        # Get document; the text itself is only loaded by the background task
+        document = get_object_or_404(
+            Document.objects.defer('extracted_text'), id=document_id, user=request.user
+        )
         
         # Check if API key is configured
         if not settings.GEMINI_API_KEY:
-            return JsonResponse({
+            return json_response({
                 'success': False,
                 'error': 'AI features not configured. Please set GEMINI_API_KEY.'
             }, status=500)
         
-        # Use extracted text directly (saves API quota vs FAISS embeddings)
-        context = document.extracted_text
-        
-        # Limit context size to avoid hitting token limits (roughly 8000 chars ~ 2000 tokens)
-        MAX_CONTEXT_CHARS = 8000
-        if len(context) > MAX_CONTEXT_CHARS:
-            context = context[:MAX_CONTEXT_CHARS] + "\n\n[... Content truncated for processing ...]"        
-        if not context:
-            return JsonResponse({
+        if not document.text_hash:
+            return json_response({
                 'success': False,
                 'error': 'No content available for this document'
             }, status=400)
         
-        # Generate summary
-        try:
-            start_time = time.time()
-            agent = get_agent('summary')
-            result = agent.generate_sync(context, summary_type=summary_type)
-            generation_time = time.time() - start_time
-        except ValueError as e:
-            # API key not configured
-            return JsonResponse({
-                'success': False,
-                'error': str(e)
-            }, status=500)
-        except Exception as e:
-            # Other generation errors
-            import traceback
-            print(traceback.format_exc())  # Log to server console
-            return JsonResponse({
-                'success': False,
-                'error': f'Generation failed: {str(e)}'
-            }, status=500)
-        
-        if not result.get('success'):
-            return JsonResponse({
-                'success': False,
-                'error': result.get('error', 'Failed to generate summary')
-            }, status=500)
-        
-        # Save summary
-        summary = Summary.objects.create(
+        # Reuse an existing summary generated from the same text
+        cached_summary = Summary.objects.filter(
             document=document,
-            content=result['summary'],
             summary_type=summary_type,
-            word_count=result.get('word_count', 0),
-            model_used=agent.model_name,
-            generation_time=generation_time,
+            context_hash=document.text_hash,
+        ).first()
+        
+        if cached_summary:
+            return json_response({
+                'success': True,
+                'cached': True,
+                'summary': {
+                    'id': str(cached_summary.id),
+                    'content': cached_summary.content,
+                    'type': cached_summary.summary_type,
+                    'word_count': cached_summary.word_count,
+                    'generation_time': round(cached_summary.generation_time, 2),
+                }
+            })
+        
+        # Generate in the background; the client polls summary_status
+        job = enqueue_job(
+            request.user, 'summary', generate_summary_task,
+            document.id, summary_type,
         )
         
-        return JsonResponse({
+        return json_response({
             'success': True,
-            'summary': {
-                'id': str(summary.id),
-                'content': summary.content,
-                'type': summary.summary_type,
-                'word_count': summary.word_count,
-                'generation_time': round(generation_time, 2),
-            }
-        })
+            'cached': False,
+            'job_id': str(job.id),
+            'status': job.status,
+        }, status=202)
         
     except json.JSONDecodeError:
-        return JsonResponse({
+        return json_response({
             'success': False,
             'error': 'Invalid JSON data'
         }, status=400)
     except Exception as e:
-        return JsonResponse({
+        return json_response({
             'success': False,
             'error': str(e)
         }, status=500)
 
 
+@login_required
+@require_http_methods(["GET"])
+def summary_status(request, job_id):
+    """Poll a background summary job started by generate_summary"""
+    job = get_object_or_404(GenerationJob, id=job_id, user=request.user, kind='summary')
+    return _job_status_response(job, 'summary')
+
+
+@login_required
+@require_http_methods(["POST"])
+def generate_summary_stream(request):
+    """
+    Generate a summary and stream it to the browser as server-sent events.
+    
+    Takes the same body as generate_summary. Each event is a JSON object:
+    {'delta': text} while the summary is being written, then the same
+    payload generate_summary returns. Saved and cached summaries are sent
+    as that single final event. Documents too long for one call, or
+    requests arriving while every stream slot is busy, are handed to the
+    background job runner instead, and the final event carries its job_id.
+    """
+    try:
+        data = orjson.loads(request.body)
+        document_id = data.get('document_id')
+        summary_type = data.get('summary_type', 'detailed')
+    except (json.JSONDecodeError, AttributeError):
+        # AttributeError: the body is valid JSON but not an object
+        return _sse_response([{'success': False, 'error': 'Invalid JSON data'}])
+    
+    if not document_id:
+        return _sse_response([{'success': False, 'error': 'Document ID required'}])
+    
+    try:
+        document = get_object_or_404(
+            Document.objects.defer('extracted_text'), id=document_id, user=request.user
+        )
+    except (ValidationError, TypeError):
+        # Not a UUID
+        return _sse_response([{'success': False, 'error': 'Invalid document ID'}])
+    
+    if not settings.GEMINI_API_KEY:
+        return _sse_response([{
+            'success': False,
+            'error': 'AI features not configured. Please set GEMINI_API_KEY.'
+        }])
+    
+    if not document.text_hash:
+        return _sse_response([{
+            'success': False,
+            'error': 'No content available for this document'
+        }])
+    
+    return _sse_response(_summary_events(request.user, document, summary_type))
+
+
+# A stream holds its web worker thread until the summary is finished, so
+# only this many run at once per process; the rest become background jobs
+_summary_stream_slots = threading.BoundedSemaphore(
+    getattr(settings, 'SUMMARY_STREAM_SLOTS', 4)
+)
+
+
+def _summary_events(user, document, summary_type):
+    """Yield the event payloads for generate_summary_stream."""
+    # Reuse an existing summary generated from the same text
+    cached_summary = Summary.objects.filter(
+        document=document,
+        summary_type=summary_type,
+        context_hash=document.text_hash,
+    ).first()
+    
+    if cached_summary:
+        yield {
+            'success': True,
+            'cached': True,
+            'summary': {
+                'id': str(cached_summary.id),
+                'content': cached_summary.content,
+                'type': cached_summary.summary_type,
+                'word_count': cached_summary.word_count,
+                'generation_time': round(cached_summary.generation_time, 2),
+            }
+        }
+        return
+    
+    agent = get_agent('summary')
+    
+    # The same text may have been summarized for another user
+    result = cached_summary_result(document, agent, summary_type)
+    if result is not None:
+        yield {**save_summary(document, agent, summary_type, result, 0.0), 'cached': True}
+        return
+    
+    # Decide from the stored stats when possible, so a document bound for
+    # map-reduce is never loaded here
+    context = None
+    total_tokens = document.estimate_tokens()
+    if total_tokens is None:
+        context = Document.objects.values_list('extracted_text', flat=True).get(id=document.id)
+        # A token is at least one character, so only long texts need counting
+        total_tokens = 0
+        if len(context) > settings.SUMMARY_MAX_CONTEXT_TOKENS:
+            total_tokens = document.count_tokens(context, agent)
+    
+    # Map-reduce has nothing to stream until the final merge
+    if (
+        total_tokens > settings.SUMMARY_MAX_CONTEXT_TOKENS
+        or not _summary_stream_slots.acquire(blocking=False)
+    ):
+        job = enqueue_job(user, 'summary', generate_summary_task, document.id, summary_type)
+        yield {
+            'success': True,
+            'cached': False,
+            'job_id': str(job.id),
+            'status': job.status,
+        }
+        return
+    
+    try:
+        if context is None:
+            context = Document.objects.values_list('extracted_text', flat=True).get(id=document.id)
+        
+        start_time = time.time()
+        parts = []
+        try:
+            deltas = stream_summary(document, agent, context, summary_type)
+            for delta in _coalesce_deltas(deltas):
+                parts.append(delta)
+                yield {'delta': delta}
+        except Exception:
+            logger.exception('Summary stream for document %s failed', document.id)
+            yield {'success': False, 'error': 'Generation failed. Please try again.'}
+            return
+        generation_time = time.time() - start_time
+    finally:
+        _summary_stream_slots.release()
+    
+    # Saved only once the whole summary has arrived; a closed stream saves nothing
+    content = ''.join(parts)
+    result = {'summary': content, 'word_count': agent.count_words(content)}
+    yield {**save_summary(document, agent, summary_type, result, generation_time), 'cached': False}
+
+
+def _coalesce_deltas(deltas, max_chars=256, max_delay=0.02):
+    """
+    Merge adjacent stream chunks into fewer, larger events.
+    
+    A batch is flushed once it holds max_chars characters or its first
+    chunk has waited max_delay seconds, and at the end of the stream.
+    """
+    batch = []
+    size = 0
+    started = 0.0
+    for delta in deltas:
+        if not batch:
+            started = time.monotonic()
+        batch.append(delta)
+        size += len(delta)
+        if size >= max_chars or time.monotonic() - started >= max_delay:
+            yield ''.join(batch)
+            batch = []
+            size = 0
+    if batch:
+        yield ''.join(batch)
+
+
+def _sse_response(events):
+    """Stream an iterable of JSON payloads as server-sent events"""
+    response = StreamingHttpResponse(
+        (b'data: ' + orjson.dumps(event) + b'\n\n' for event in events),
+        content_type='text/event-stream',
+    )
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def _job_status_response(job, *payload_keys):
+    """Build the polling response for a GenerationJob"""
+    expire_stale_job(job)
+    if job.status == 'failure':
+        return json_response({
+            'success': False,
+            'status': job.status,
+            'error': job.error,
+        })
+    
+    response = {
+        'success': True,
+        'status': job.status,
+    }
+    if job.status == 'success':
+        for key in payload_keys:
+            response[key] = job.result.get(key)
+    return json_response(response)
+
+
 @login_required
 def document_detail(request, document_id):
     """View a specific document and its summaries"""
-    document = get_object_or_404(Document, id=document_id, user=request.user)
+    document = get_object_or_404(
+        Document.objects.select_related('user').prefetch_related('summaries').defer('extracted_text'),
+        id=document_id,
+        user=request.user,
+    )
+    # Served from the prefetch cache; no further queries per summary
     summaries = document.summaries.all()
     
     context = {
@@ -238,18 +467,17 @@ def document_detail(request, document_id):
 @require_http_methods(["DELETE"])
 def delete_document(request, document_id):
     """Delete a document"""
-    document = get_object_or_404(Document, id=document_id, user=request.user)
-    
-    # Delete from vector store
-    vector_service = VectorStoreService()
-    vector_service.delete_document(document.vector_doc_id)
+    document = get_object_or_404(
+        Document.objects.only('id', 'file'), id=document_id, user=request.user
+    )
+    vector_doc_id, file_name = document.vector_doc_id, document.file.name
     
-    # Delete file and record
-    if document.file:
-        document.file.delete(save=False)
+    # Delete the record now; the vector index and file are removed in the background
     document.delete()
+    _invalidate_analytics(request.user)
+    run_in_background(cleanup_document_task, vector_doc_id, file_name or '')
     
-    return JsonResponse({'success': True})
+    return json_response({'success': True})
 
 
 # ========== Quiz Views ==========
@@ -258,7 +486,9 @@ def delete_document(request, document_id):
 def quizzes(request):
     """Quiz hub - select documents and generate quizzes"""
     # Get user's documents
-    documents = Document.objects.filter(user=request.user).order_by('-created_at')[:10]
+    documents = Document.objects.filter(user=request.user).only(
+        *DOCUMENT_LIST_FIELDS
+    ).order_by('-created_at')[:10]
     
     # Get user's recent quizzes
     recent_quizzes = Quiz.objects.filter(user=request.user).order_by('-created_at')[:5]
@@ -275,117 +505,66 @@ def quizzes(request):
 def generate_quiz(request):
     """Generate a quiz from a document via AJAX"""
     try:
-        data = json.loads(request.body)
+        data = orjson.loads(request.body)
         document_id = data.get('document_id')
         difficulty = data.get('difficulty', 'medium')
         question_count = int(data.get('question_count', 5))
         
         if not document_id:
-            return JsonResponse({
+            return json_response({
                 'success': False,
                 'error': 'Document ID required'
             }, status=400)
         
-        # Get document
-        document = get_object_or_404(Document, id=document_id, user=request.user)
+        # Get document; the text itself is only loaded by the background task
+        document = get_object_or_404(
+            Document.objects.defer('extracted_text'), id=document_id, user=request.user
+        )
         
         # Check if API key is configured
         if not settings.GEMINI_API_KEY:
-            return JsonResponse({
+            return json_response({
                 'success': False,
                 'error': 'AI features not configured. Please set GEMINI_API_KEY.'
             }, status=500)
         
-        # Get document content
-        context = document.extracted_text
-        
-        # Limit context size
-        MAX_CONTEXT_CHARS = 8000
-        if len(context) > MAX_CONTEXT_CHARS:
-            context = context[:MAX_CONTEXT_CHARS] + "\n\n[... Content truncated for processing ...]"
-        
-        if not context:
-            return JsonResponse({
+        if not document.text_hash:
+            return json_response({
                 'success': False,
                 'error': 'No content available for this document'
             }, status=400)
         
-        # Generate quiz
-        try:
-            start_time = time.time()
-            agent = get_agent('quiz')
-            result = agent.generate_sync(
-                context, 
-                difficulty=difficulty, 
-                question_count=question_count
-            )
-            generation_time = time.time() - start_time
-        except ValueError as e:
-            return JsonResponse({
-                'success': False,
-                'error': str(e)
-            }, status=500)
-        except Exception as e:
-            import traceback
-            print(traceback.format_exc())
-            return JsonResponse({
-                'success': False,
-                'error': f'Generation failed: {str(e)}'
-            }, status=500)
-        
-        if not result.get('success'):
-            return JsonResponse({
-                'success': False,
-                'error': result.get('error', 'Failed to generate quiz')
-            }, status=500)
-        
-        # Create quiz and questions
-        quiz = Quiz.objects.create(
-            document=document,
-            user=request.user,
-            title=f"Quiz on {document.title}",
-            difficulty=difficulty,
-            question_count=len(result['questions']),
-            model_used=agent.model_name,
-            generation_time=generation_time,
+        # Generate in the background; the client polls quiz_status
+        job = enqueue_job(
+            request.user, 'quiz', generate_quiz_task,
+            document.id, difficulty, question_count,
         )
         
-        # Create questions
-        for q_data in result['questions']:
-            QuizQuestion.objects.create(
-                quiz=quiz,
-                question_text=q_data['question'],
-                option_a=q_data['option_a'],
-                option_b=q_data['option_b'],
-                option_c=q_data['option_c'],
-                option_d=q_data['option_d'],
-                correct_answer=q_data['correct_answer'],
-                explanation=q_data.get('explanation', ''),
-                order=q_data.get('order', 0),
-            )
-        
-        return JsonResponse({
+        return json_response({
             'success': True,
-            'quiz': {
-                'id': str(quiz.id),
-                'title': quiz.title,
-                'difficulty': quiz.difficulty,
-                'question_count': quiz.question_count,
-            }
-        })
+            'job_id': str(job.id),
+            'status': job.status,
+        }, status=202)
         
     except json.JSONDecodeError:
-        return JsonResponse({
+        return json_response({
             'success': False,
             'error': 'Invalid JSON data'
         }, status=400)
     except Exception as e:
-        return JsonResponse({
+        return json_response({
             'success': False,
             'error': str(e)
         }, status=500)
 
 
+@login_required
+@require_http_methods(["GET"])
+def quiz_status(request, job_id):
+    """Poll a background quiz job started by generate_quiz"""
+    job = get_object_or_404(GenerationJob, id=job_id, user=request.user, kind='quiz')
+    return _job_status_response(job, 'quiz')
+
 @login_required
 def take_quiz(request, quiz_id):
     """Display a quiz for the user to take"""
@@ -395,7 +574,12 @@ def take_quiz(request, quiz_id):
     if quiz.is_completed:
         return redirect('quiz_result', quiz_id=quiz.id)
     
-    questions = quiz.questions.all()
+    # The page shows questions and options only; answers and explanations
+    # stay server-side until the quiz is submitted
+    questions = quiz.questions.only(
+        'id', 'quiz_id', 'question_text',
+        'option_a', 'option_b', 'option_c', 'option_d', 'order',
+    )
     
     context = {
         'quiz': quiz,
@@ -404,57 +588,74 @@ def take_quiz(request, quiz_id):
     return render(request, 'pages/take_quiz.html', context)
 
 
+VALID_ANSWERS = frozenset('ABCD')
+
+
 @login_required
 @require_http_methods(["POST"])
 def submit_quiz(request, quiz_id):
     """Submit quiz answers and calculate score"""
     try:
-        quiz = get_object_or_404(Quiz, id=quiz_id, user=request.user)
-        
-        if quiz.is_completed:
-            return JsonResponse({
-                'success': False,
-                'error': 'Quiz already completed'
-            }, status=400)
-        
-        data = json.loads(request.body)
+        data = orjson.loads(request.body)
         answers = data.get('answers', {})
         
-        # Process answers
-        correct_count = 0
-        questions = quiz.questions.all()
-        
-        for question in questions:
-            user_answer = answers.get(str(question.id), '').upper()
-            if user_answer in ['A', 'B', 'C', 'D']:
-                question.user_answer = user_answer
-                question.save()
-                
-                if user_answer == question.correct_answer:
-                    correct_count += 1
-        
-        # Update quiz
-        quiz.score = correct_count
-        quiz.is_completed = True
-        quiz.completed_at = timezone.now()
-        
-        # Calculate XP
-        xp_earned = quiz.calculate_xp()
-        quiz.xp_earned = xp_earned
-        quiz.save()
+        # Lock the quiz so a double submit cannot award XP twice
+        with transaction.atomic():
+            quiz = get_object_or_404(
+                Quiz.objects.select_for_update(), id=quiz_id, user=request.user
+            )
+            
+            if quiz.is_completed:
+                return json_response({
+                    'success': False,
+                    'error': 'Quiz already completed'
+                }, status=400)
+            
+            # Normalize the submitted answers once, up front
+            answers = {
+                question_id: answer.upper()
+                for question_id, answer in answers.items()
+                if isinstance(answer, str)
+            }
+            
+            # Process answers; all of them are written in one UPDATE
+            correct_count = 0
+            answered = []
+            
+            # Grading needs only the answer columns, not the question text
+            for question in quiz.questions.only('id', 'correct_answer', 'user_answer'):
+                user_answer = answers.get(str(question.id))
+                if user_answer in VALID_ANSWERS:
+                    question.user_answer = user_answer
+                    answered.append(question)
+                    
+                    if user_answer == question.correct_answer:
+                        correct_count += 1
+            
+            QuizQuestion.objects.bulk_update(answered, ['user_answer'])
+            
+            # Update quiz
+            quiz.score = correct_count
+            quiz.percentage_score = quiz.calculate_percentage_score()
+            quiz.is_completed = True
+            quiz.completed_at = timezone.now()
+            
+            # Calculate XP
+            xp_earned = quiz.calculate_xp()
+            quiz.xp_earned = xp_earned
+            quiz.save()
+            
+            # Update user profile in one atomic UPDATE
+            UserProfile.record_activity(
+                request.user,
+                xp=xp_earned,
+                total_quizzes_taken=1,
+                total_quizzes_passed=1 if quiz.percentage_score >= 70 else 0,  # Pass threshold
+                total_questions_answered=quiz.question_count,
+                total_correct_answers=correct_count,
+            )
         
-        # Update user profile
-        profile = request.user.profile
-        profile.add_xp(xp_earned)
-        profile.total_quizzes_taken += 1
-        if quiz.percentage_score >= 70:  # Pass threshold
-            profile.total_quizzes_passed += 1
-        profile.total_questions_answered += quiz.question_count
-        profile.total_correct_answers += correct_count
-        profile.update_streak()
-        profile.save()
-        
-        return JsonResponse({
+        return json_response({
             'success': True,
             'result': {
                 'quiz_id': str(quiz.id),
@@ -467,12 +668,18 @@ def submit_quiz(request, quiz_id):
         })
         
     except json.JSONDecodeError:
-        return JsonResponse({
+        return json_response({
             'success': False,
             'error': 'Invalid JSON data'
         }, status=400)
+    except Http404:
+        # Raised by the locked lookup inside the try block
+        return json_response({
+            'success': False,
+            'error': 'Quiz not found'
+        }, status=404)
     except Exception as e:
-        return JsonResponse({
+        return json_response({
             'success': False,
             'error': str(e)
         }, status=500)
@@ -501,7 +708,9 @@ def quiz_result(request, quiz_id):
 def flashcards(request):
     """Flashcard hub - select documents and generate flashcards"""
     # Get user's documents
-    documents = Document.objects.filter(user=request.user).order_by('-created_at')[:10]
+    documents = Document.objects.filter(user=request.user).only(
+        *DOCUMENT_LIST_FIELDS
+    ).order_by('-created_at')[:10]
     
     # Get user's recent flashcard sets
     recent_sets = FlashcardSet.objects.filter(user=request.user).order_by('-created_at')[:5]
@@ -518,130 +727,106 @@ def flashcards(request):
 def generate_flashcards(request):
     """Generate flashcards from a document via AJAX"""
     try:
-        data = json.loads(request.body)
+        data = orjson.loads(request.body)
         document_id = data.get('document_id')
         card_count = int(data.get('card_count', 10))
         
         if not document_id:
-            return JsonResponse({
+            return json_response({
                 'success': False,
                 'error': 'Document ID required'
             }, status=400)
         
-        # Get document
-        document = get_object_or_404(Document, id=document_id, user=request.user)
+        # Get document; the text itself is only loaded by the background task
+        document = get_object_or_404(
+            Document.objects.defer('extracted_text'), id=document_id, user=request.user
+        )
         
         # Check if API key is configured
         if not settings.GEMINI_API_KEY:
-            return JsonResponse({
+            return json_response({
                 'success': False,
                 'error': 'AI features not configured. Please set GEMINI_API_KEY.'
             }, status=500)
         
-        # Get document content
-        context = document.extracted_text
-        
-        # Limit context size
-        MAX_CONTEXT_CHARS = 10000  # Slightly larger for better flashcard coverage
-        if len(context) > MAX_CONTEXT_CHARS:
-            context = context[:MAX_CONTEXT_CHARS] + "\n\n[... Content truncated for processing ...]"
-        
-        if not context:
-            return JsonResponse({
+        if not document.text_hash:
+            return json_response({
                 'success': False,
                 'error': 'No content available for this document'
             }, status=400)
         
-        # Generate flashcards
-        try:
-            start_time = time.time()
-            agent = get_agent('flashcard')
-            result = agent.generate_sync(
-                context, 
-                card_count=card_count
-            )
-            generation_time = time.time() - start_time
-        except ValueError as e:
-            return JsonResponse({
-                'success': False,
-                'error': str(e)
-            }, status=500)
-        except Exception as e:
-            import traceback
-            print(traceback.format_exc())
-            return JsonResponse({
-                'success': False,
-                'error': f'Generation failed: {str(e)}'
-            }, status=500)
-        
-        if not result.get('success'):
-            return JsonResponse({
-                'success': False,
-                'error': result.get('error', 'Failed to generate flashcards')
-            }, status=500)
-        
-        # Create flashcard set and cards
-        flashcard_set = FlashcardSet.objects.create(
-            document=document,
-            user=request.user,
-            title=f"Flashcards: {document.title}",
-            card_count=len(result['flashcards']),
-            model_used=agent.model_name,
-            generation_time=generation_time,
+        # Generate in the background; the client polls flashcards_status
+        job = enqueue_job(
+            request.user, 'flashcards', generate_flashcards_task,
+            document.id, card_count,
         )
         
-        # Create flashcards
-        for card_data in result['flashcards']:
-            Flashcard.objects.create(
-                flashcard_set=flashcard_set,
-                front=card_data['front'],
-                back=card_data['back'],
-                priority=card_data.get('priority', 3),
-                order=card_data.get('order', 0),
-            )
-        
-        return JsonResponse({
+        return json_response({
             'success': True,
-            'flashcard_set': {
-                'id': str(flashcard_set.id),
-                'title': flashcard_set.title,
-                'card_count': flashcard_set.card_count,
-            }
-        })
+            'job_id': str(job.id),
+            'status': job.status,
+        }, status=202)
         
     except json.JSONDecodeError:
-        return JsonResponse({
+        return json_response({
             'success': False,
             'error': 'Invalid JSON data'
         }, status=400)
     except Exception as e:
-        return JsonResponse({
+        return json_response({
             'success': False,
             'error': str(e)
         }, status=500)
 
 
 @login_required
+@require_http_methods(["GET"])
+def flashcards_status(request, job_id):
+    """Poll a background flashcard job started by generate_flashcards"""
+    job = get_object_or_404(GenerationJob, id=job_id, user=request.user, kind='flashcards')
+    return _job_status_response(job, 'flashcard_set')
+
+
+def _page_etag(request, *parts):
+    """Hash parts with the CSRF secret so a cached page never carries a stale token."""
+    get_token(request)
+    key = ':'.join(str(part) for part in (*parts, request.META.get('CSRF_COOKIE', '')))
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+
+def _flashcard_set_etag(request, set_id):
+    """
+    ETag for the study page: the set's card state plus the CSRF secret
+    embedded in the page. last_studied_at is left out since the view
+    itself writes it on every render.
+    """
+    updated_at = FlashcardSet.objects.filter(
+        id=set_id, user=request.user
+    ).values_list('updated_at', flat=True).first()
+    if updated_at is None:
+        return None
+    return _page_etag(request, set_id, updated_at.timestamp())
+
+
+@login_required
+@condition(etag_func=_flashcard_set_etag)
 def study_flashcards(request, set_id):
     """Display flashcards for studying"""
     flashcard_set = get_object_or_404(FlashcardSet, id=set_id, user=request.user)
     cards = flashcard_set.cards.all()
     
-    # Update last studied time
+    # Update last studied time; rebuild the serialized cards only if stale
     flashcard_set.last_studied_at = timezone.now()
-    flashcard_set.save(update_fields=['last_studied_at'])
+    update_fields = ['last_studied_at']
+    if not flashcard_set.cards_json:
+        flashcard_set.cards_json = FlashcardSet.serialize_cards(cards)
+        update_fields.append('cards_json')
+    flashcard_set.save(update_fields=update_fields)
     
     context = {
         'flashcard_set': flashcard_set,
         'cards': cards,
-        'cards_json': json.dumps([{
-            'id': str(card.id),
-            'front': card.front,
-            'back': card.back,
-            'priority': card.priority,
-            'is_mastered': card.is_mastered,
-            'order': card.order,
-        } for card in cards]),
+        'cards_json': flashcard_set.cards_json,
     }
     return render(request, 'pages/study_flashcards.html', context)
 
@@ -651,16 +836,19 @@ def study_flashcards(request, set_id):
 def toggle_flashcard_mastery(request, card_id):
     """Toggle the mastered status of a flashcard"""
     try:
-        card = get_object_or_404(Flashcard, id=card_id, flashcard_set__user=request.user)
+        card = get_object_or_404(
+            Flashcard.objects.select_related('flashcard_set').defer('flashcard_set__cards_json'),
+            id=card_id, flashcard_set__user=request.user,
+        )
         card.toggle_mastered()
         
-        return JsonResponse({
+        return json_response({
             'success': True,
             'is_mastered': card.is_mastered,
             'set_progress': card.flashcard_set.progress_percentage,
         })
     except Exception as e:
-        return JsonResponse({
+        return json_response({
             'success': False,
             'error': str(e)
         }, status=500)
@@ -672,7 +860,9 @@ def toggle_flashcard_mastery(request, card_id):
 def flowcharts(request):
     """Flowchart hub - select documents and generate flowcharts"""
     # Get user's documents
-    documents = Document.objects.filter(user=request.user).order_by('-created_at')[:10]
+    documents = Document.objects.filter(user=request.user).only(
+        *DOCUMENT_LIST_FIELDS
+    ).order_by('-created_at')[:10]
     
     # Get user's recent flowcharts
     recent_flowcharts = Flowchart.objects.filter(user=request.user).order_by('-created_at')[:5]
@@ -689,160 +879,122 @@ def flowcharts(request):
 def generate_flowchart(request):
     """Generate a flowchart from a document via AJAX"""
     try:
-        data = json.loads(request.body)
+        data = orjson.loads(request.body)
         document_id = data.get('document_id')
         detail_level = data.get('detail_level', 'medium')
         
         if not document_id:
-            return JsonResponse({
+            return json_response({
                 'success': False,
                 'error': 'Document ID required'
             }, status=400)
         
-        # Get document
-        document = get_object_or_404(Document, id=document_id, user=request.user)
+        # Get document; the text itself is only loaded by the background task
+        document = get_object_or_404(
+            Document.objects.defer('extracted_text'), id=document_id, user=request.user
+        )
         
         # Check if API key is configured
         if not settings.GEMINI_API_KEY:
-            return JsonResponse({
+            return json_response({
                 'success': False,
                 'error': 'AI features not configured. Please set GEMINI_API_KEY.'
             }, status=500)
         
-        # Get document content
-        context = document.extracted_text
-        
-        # Limit context size
-        MAX_CONTEXT_CHARS = 10000
-        if len(context) > MAX_CONTEXT_CHARS:
-            context = context[:MAX_CONTEXT_CHARS] + "\n\n[... Content truncated for processing ...]"
-        
-        if not context:
-            return JsonResponse({
+        if not document.text_hash:
+            return json_response({
                 'success': False,
                 'error': 'No content available for this document'
             }, status=400)
         
-        # Generate flowcharts
-        try:
-            start_time = time.time()
-            agent = get_agent('flowchart')
-            result = agent.generate_sync(
-                context, 
-                detail_level=detail_level
-            )
-            generation_time = time.time() - start_time
-        except ValueError as e:
-            return JsonResponse({
-                'success': False,
-                'error': str(e)
-            }, status=500)
-        except Exception as e:
-            import traceback
-            print(traceback.format_exc())
-            return JsonResponse({
-                'success': False,
-                'error': f'Generation failed: {str(e)}'
-            }, status=500)
-        
-        if not result.get('success'):
-            return JsonResponse({
-                'success': False,
-                'error': result.get('error', 'Failed to generate flowcharts')
-            }, status=500)
-        
-        created_flowcharts = []
-        
-        # Create flowcharts
-        for fc_data in result.get('flowcharts', []):
-            flowchart = Flowchart.objects.create(
-                document=document,
-                user=request.user,
-                title=fc_data.get('title', f"Flowchart: {document.title}"),
-                description=fc_data.get('description', ''),
-                node_count=fc_data.get('node_count', 0),
-                edge_count=fc_data.get('edge_count', 0),
-                model_used=agent.model_name,
-                generation_time=generation_time,
-            )
-            
-            # Create nodes
-            for i, node_data in enumerate(fc_data['nodes']):
-                FlowchartNode.objects.create(
-                    flowchart=flowchart,
-                    node_id=node_data['id'],
-                    label=node_data['label'],
-                    node_type=node_data['type'],
-                    order=i,
-                )
-            
-            # Create edges
-            for edge_data in fc_data['edges']:
-                FlowchartEdge.objects.create(
-                    flowchart=flowchart,
-                    from_node=edge_data['from'],
-                    to_node=edge_data['to'],
-                    label=edge_data.get('label', ''),
-                )
-            
-            created_flowcharts.append({
-                'id': str(flowchart.id),
-                'title': flowchart.title,
-                'node_count': flowchart.node_count
-            })
+        # Generate in the background; the client polls flowchart_status
+        job = enqueue_job(
+            request.user, 'flowchart', generate_flowchart_task,
+            document.id, detail_level,
+        )
         
-        return JsonResponse({
+        return json_response({
             'success': True,
-            'count': len(created_flowcharts),
-            'flowcharts': created_flowcharts
-        })
+            'job_id': str(job.id),
+            'status': job.status,
+        }, status=202)
         
     except json.JSONDecodeError:
-        return JsonResponse({
+        return json_response({
             'success': False,
             'error': 'Invalid JSON data'
         }, status=400)
     except Exception as e:
-        return JsonResponse({
+        return json_response({
             'success': False,
             'error': str(e)
         }, status=500)
 
 
 @login_required
+@require_http_methods(["GET"])
+def flowchart_status(request, job_id):
+    """Poll a background flowchart job started by generate_flowchart"""
+    job = get_object_or_404(GenerationJob, id=job_id, user=request.user, kind='flowchart')
+    return _job_status_response(job, 'count', 'flowcharts')
+
+def _flowchart_etag(request, flowchart_id):
+    """ETag for a flowchart page; flowcharts are never edited after creation."""
+    created_at = Flowchart.objects.filter(
+        id=flowchart_id, user=request.user
+    ).values_list('created_at', flat=True).first()
+    if created_at is None:
+        return None
+    return _page_etag(request, flowchart_id, created_at.timestamp())
+
+
+@login_required
+@condition(etag_func=_flowchart_etag)
 def view_flowchart(request, flowchart_id):
     """Display an interactive flowchart"""
     flowchart = get_object_or_404(Flowchart, id=flowchart_id, user=request.user)
-    nodes = flowchart.nodes.all()
-    edges = flowchart.edges.all()
-    
-    # Prepare JSON data for JavaScript visualization
-    nodes_data = [{
-        'id': node.node_id,
-        'label': node.label,
-        'type': node.node_type,
-        'x': node.position_x,
-        'y': node.position_y,
-    } for node in nodes]
-    
-    edges_data = [{
-        'from': edge.from_node,
-        'to': edge.to_node,
-        'label': edge.label,
-    } for edge in edges]
+    
+    # Flowcharts generated before graph_json existed are serialized once
+    if not flowchart.graph_json:
+        flowchart.graph_json = Flowchart.serialize_graph(
+            flowchart.nodes.all(), flowchart.edges.all()
+        )
+        flowchart.save(update_fields=['graph_json'])
     
     context = {
         'flowchart': flowchart,
-        'nodes': nodes,
-        'edges': edges,
-        'nodes_json': nodes_data,
-        'edges_json': edges_data,
+        'graph_json': flowchart.graph_json,
     }
     return render(request, 'pages/view_flowchart.html', context)
 
 
 # ========== Other Feature Placeholders ==========
 
+# Seconds a user's analytics charts are reused between page views
+ANALYTICS_CACHE_TIMEOUT = 300
+
+# Rows fetched per round trip when streaming a user's quiz and evaluation history
+ANALYTICS_CHUNK_SIZE = 500
+
+
+def _user_count(queryset, user_field):
+    """Scalar subquery counting the rows of queryset owned by the outer user."""
+    return Coalesce(Subquery(
+        queryset.filter(**{user_field: OuterRef('pk')})
+        .order_by()
+        .values(user_field)
+        .annotate(count=Count('pk'))
+        .values('count')
+    ), 0)
+
+
+def _invalidate_analytics(user):
+    """Make the next analytics view rebuild its charts for user."""
+    # The cache key embeds profile.updated_at; UserProfile.record_activity
+    # already bumps it for quiz results and evaluations
+    UserProfile.objects.filter(user=user).update(updated_at=timezone.now())
+
+
 @login_required
 def analytics(request):
     """
@@ -851,50 +1003,88 @@ def analytics(request):
     Aggregates data across all features to give the user
     a comprehensive view of their learning journey.
     """
-    from django.db.models import Avg, Count, Sum, Q
-    from django.db.models.functions import TruncDate
-    import json as json_lib
-    from datetime import timedelta
-    
     user = request.user
     profile = user.profile
     
+    # Quiz results, evaluations and document uploads or deletions change
+    # profile.updated_at, and with it the key (see _invalidate_analytics);
+    # other activity shows up once the entry expires
+    cache_key = f'analytics:{user.pk}:{profile.updated_at.timestamp()}'
+    context = cache.get(cache_key)
+    if context is None:
+        context = _analytics_charts(user)
+        cache.set(cache_key, context, ANALYTICS_CACHE_TIMEOUT)
+    
+    # ── XP & Level ──
+    xp_for_next = ((profile.level) * 1000) - profile.xp_points
+    xp_progress_pct = round((profile.xp_points % 1000) / 10, 1)
+    
+    context = {
+        **context,
+        
+        # Profile stats
+        'profile': profile,
+        'xp_for_next': max(xp_for_next, 0),
+        'xp_progress_pct': xp_progress_pct,
+    }
+    return render(request, 'pages/analytics.html', context)
+
+
+def _analytics_charts(user):
+    """Build the analytics context that does not depend on the profile."""
+    from django.db.models.functions import TruncDate
+    from datetime import timedelta
+    
     # ── Overview Stats ──
-    total_documents = Document.objects.filter(user=user).count()
-    total_summaries = Summary.objects.filter(document__user=user).count()
-    total_quizzes = Quiz.objects.filter(user=user, is_completed=True).count()
-    total_flashcard_sets = FlashcardSet.objects.filter(document__user=user).count()
-    total_flowcharts = Flowchart.objects.filter(document__user=user).count()
-    total_podcasts = Podcast.objects.filter(document__user=user).count()
-    total_evaluations = AnswerSheetEvaluation.objects.filter(user=user, is_evaluated=True).count()
-    total_chats = ChatSession.objects.filter(user=user).count()
+    # Counts not derivable from the chart queries below, in one round-trip
+    counts = get_user_model().objects.filter(pk=user.pk).annotate(
+        total_documents=_user_count(Document.objects, 'user'),
+        total_summaries=_user_count(Summary.objects, 'document__user'),
+        total_flowcharts=_user_count(Flowchart.objects, 'document__user'),
+        total_podcasts=_user_count(Podcast.objects, 'document__user'),
+        total_chats=_user_count(ChatSession.objects, 'user'),
+    ).values(
+        'total_documents', 'total_summaries', 'total_flowcharts',
+        'total_podcasts', 'total_chats',
+    ).get()
+    total_documents = counts['total_documents']
+    total_summaries = counts['total_summaries']
+    total_flowcharts = counts['total_flowcharts']
+    total_podcasts = counts['total_podcasts']
+    total_chats = counts['total_chats']
     
     # ── Quiz Performance ──
     completed_quizzes = Quiz.objects.filter(
         user=user, is_completed=True
-    ).order_by('completed_at')
+    ).order_by('completed_at').values_list(
+        'percentage_score', 'difficulty', 'completed_at', 'created_at'
+    ).iterator(chunk_size=ANALYTICS_CHUNK_SIZE)
     
     quiz_scores = []
     quiz_labels = []
     quiz_difficulties = {'easy': 0, 'medium': 0, 'hard': 0}
     
-    for q in completed_quizzes:
-        pct = q.percentage_score
+    for pct, difficulty, completed_at, created_at in completed_quizzes:
         quiz_scores.append(pct)
-        label = q.completed_at.strftime('%b %d') if q.completed_at else q.created_at.strftime('%b %d')
-        quiz_labels.append(label)
-        if q.difficulty in quiz_difficulties:
-            quiz_difficulties[q.difficulty] += 1
+        quiz_labels.append((completed_at or created_at).strftime('%b %d'))
+        if difficulty in quiz_difficulties:
+            quiz_difficulties[difficulty] += 1
     
+    total_quizzes = len(quiz_scores)
     avg_quiz_score = round(sum(quiz_scores) / len(quiz_scores), 1) if quiz_scores else 0
     
     # ── Flashcard Mastery ──
+    # card_count and cards_mastered are kept up to date on the set itself
+    # Long titles are shortened by the database, so only 20 characters are sent
     flashcard_sets_data = FlashcardSet.objects.filter(
         document__user=user
-    ).annotate(
-        total_cards=Count('cards'),
-        mastered_cards=Count('cards', filter=Q(cards__is_mastered=True)),
-    )
+    ).annotate(short_title=Case(
+        When(
+            GreaterThan(Length('title'), 20),
+            then=Concat(Substr('title', 1, 20), Value('...'), output_field=CharField()),
+        ),
+        default=F('title'),
+    )).values_list('short_title', 'card_count', 'cards_mastered')
     
     fc_names = []
     fc_mastered = []
@@ -902,64 +1092,56 @@ def analytics(request):
     total_cards_all = 0
     total_mastered_all = 0
     
-    for fs in flashcard_sets_data:
-        title = fs.title[:20] + '...' if len(fs.title) > 20 else fs.title
+    for title, total_cards, mastered_cards in flashcard_sets_data:
         fc_names.append(title)
-        fc_mastered.append(fs.mastered_cards)
-        fc_remaining.append(fs.total_cards - fs.mastered_cards)
-        total_cards_all += fs.total_cards
-        total_mastered_all += fs.mastered_cards
+        fc_mastered.append(mastered_cards)
+        fc_remaining.append(total_cards - mastered_cards)
+        total_cards_all += total_cards
+        total_mastered_all += mastered_cards
     
+    total_flashcard_sets = len(fc_names)
     flashcard_mastery_pct = round((total_mastered_all / total_cards_all) * 100, 1) if total_cards_all > 0 else 0
     
     # ── Evaluation Scores ──
     evaluations_data = AnswerSheetEvaluation.objects.filter(
         user=user, is_evaluated=True
-    ).order_by('created_at')
+    ).order_by('created_at').values_list('overall_score', 'created_at').iterator(
+        chunk_size=ANALYTICS_CHUNK_SIZE
+    )
     
     eval_scores = []
     eval_labels = []
-    for ev in evaluations_data:
-        score = ev.overall_score if hasattr(ev, 'overall_score') and ev.overall_score else 0
-        eval_scores.append(round(score, 1))
-        eval_labels.append(ev.created_at.strftime('%b %d'))
+    for overall_score, created_at in evaluations_data:
+        eval_scores.append(round(overall_score or 0, 1))
+        eval_labels.append(created_at.strftime('%b %d'))
     
+    total_evaluations = len(eval_scores)
     avg_eval_score = round(sum(eval_scores) / len(eval_scores), 1) if eval_scores else 0
     
     # ── Activity over last 30 days ──
     thirty_days_ago = timezone.now() - timedelta(days=30)
     
-    # Quizzes per day
-    quiz_activity = (
-        Quiz.objects.filter(user=user, created_at__gte=thirty_days_ago)
-        .annotate(day=TruncDate('created_at'))
-        .values('day')
-        .annotate(count=Count('id'))
-        .order_by('day')
-    )
-    
-    # Documents per day
-    doc_activity = (
-        Document.objects.filter(user=user, created_at__gte=thirty_days_ago)
-        .annotate(day=TruncDate('created_at'))
-        .values('day')
-        .annotate(count=Count('id'))
-        .order_by('day')
-    )
-    
-    # Build a 30-day timeline
-    activity_labels = []
-    activity_quiz_counts = []
-    activity_doc_counts = []
+    # Quizzes and documents per day, in one UNION ALL query
+    def per_day(model, kind):
+        return (
+            model.objects.filter(user=user, created_at__gte=thirty_days_ago)
+            .annotate(day=TruncDate('created_at'), kind=Value(kind, output_field=CharField()))
+            .values('day', 'kind')
+            .annotate(count=Count('id'))
+            .order_by()
+            .values_list('kind', 'day', 'count')
+        )
     
-    quiz_by_day = {item['day']: item['count'] for item in quiz_activity}
-    doc_by_day = {item['day']: item['count'] for item in doc_activity}
+    activity = {'quiz': {}, 'document': {}}
+    for kind, day, count in per_day(Quiz, 'quiz').union(per_day(Document, 'document'), all=True):
+        activity[kind][day] = count
     
-    for i in range(30):
-        day = (timezone.now() - timedelta(days=29 - i)).date()
-        activity_labels.append(day.strftime('%b %d'))
-        activity_quiz_counts.append(quiz_by_day.get(day, 0))
-        activity_doc_counts.append(doc_by_day.get(day, 0))
+    # Build a 30-day timeline; TruncDate buckets by the local date too
+    today = timezone.localdate()
+    days = [today - timedelta(days=29 - i) for i in range(30)]
+    activity_labels = [day.strftime('%b %d') for day in days]
+    activity_quiz_counts = [activity['quiz'].get(day, 0) for day in days]
+    activity_doc_counts = [activity['document'].get(day, 0) for day in days]
     
     # ── Feature Usage Breakdown ──
     feature_usage = {
@@ -972,11 +1154,7 @@ def analytics(request):
         'Chat Sessions': total_chats,
     }
     
-    # ── XP & Level ──
-    xp_for_next = ((profile.level) * 1000) - profile.xp_points
-    xp_progress_pct = round((profile.xp_points % 1000) / 10, 1)
-    
-    context = {
+    return {
         # Overview
         'total_documents': total_documents,
         'total_quizzes': total_quizzes,
@@ -984,39 +1162,33 @@ def analytics(request):
         'total_evaluations': total_evaluations,
         'total_chats': total_chats,
         
-        # Profile stats
-        'profile': profile,
-        'xp_for_next': max(xp_for_next, 0),
-        'xp_progress_pct': xp_progress_pct,
-        
         # Quiz charts (JSON)
-        'quiz_scores_json': json_lib.dumps(quiz_scores),
-        'quiz_labels_json': json_lib.dumps(quiz_labels),
-        'quiz_difficulties_json': json_lib.dumps(quiz_difficulties),
+        'quiz_scores_json': orjson.dumps(quiz_scores).decode(),
+        'quiz_labels_json': orjson.dumps(quiz_labels).decode(),
+        'quiz_difficulties_json': orjson.dumps(quiz_difficulties).decode(),
         'avg_quiz_score': avg_quiz_score,
         
         # Flashcard charts (JSON)
-        'fc_names_json': json_lib.dumps(fc_names),
-        'fc_mastered_json': json_lib.dumps(fc_mastered),
-        'fc_remaining_json': json_lib.dumps(fc_remaining),
+        'fc_names_json': orjson.dumps(fc_names).decode(),
+        'fc_mastered_json': orjson.dumps(fc_mastered).decode(),
+        'fc_remaining_json': orjson.dumps(fc_remaining).decode(),
         'flashcard_mastery_pct': flashcard_mastery_pct,
         'total_cards_all': total_cards_all,
         'total_mastered_all': total_mastered_all,
         
         # Evaluation charts (JSON)
-        'eval_scores_json': json_lib.dumps(eval_scores),
-        'eval_labels_json': json_lib.dumps(eval_labels),
+        'eval_scores_json': orjson.dumps(eval_scores).decode(),
+        'eval_labels_json': orjson.dumps(eval_labels).decode(),
         'avg_eval_score': avg_eval_score,
         
         # Activity timeline (JSON)
-        'activity_labels_json': json_lib.dumps(activity_labels),
-        'activity_quiz_json': json_lib.dumps(activity_quiz_counts),
-        'activity_doc_json': json_lib.dumps(activity_doc_counts),
+        'activity_labels_json': orjson.dumps(activity_labels).decode(),
+        'activity_quiz_json': orjson.dumps(activity_quiz_counts).decode(),
+        'activity_doc_json': orjson.dumps(activity_doc_counts).decode(),
         
         # Feature usage (JSON)
-        'feature_usage_json': json_lib.dumps(feature_usage),
+        'feature_usage_json': orjson.dumps(feature_usage).decode(),
     }
-    return render(request, 'pages/analytics.html', context)
 
 
 # ========== Answer Sheet Evaluation Views ==========
@@ -1033,7 +1205,7 @@ def upload_answer_sheet(request):
     """Upload answer sheet image for AI evaluation"""
     try:
         if 'file' not in request.FILES:
-            return JsonResponse({
+            return json_response({
                 'success': False,
                 'error': 'No file uploaded'
             }, status=400)
@@ -1044,7 +1216,7 @@ def upload_answer_sheet(request):
         # Validate file type - only images for Gemini Vision
         file_ext = uploaded_file.name.lower().split('.')[-1]
         if file_ext not in ['png', 'jpg', 'jpeg', 'gif', 'webp']:
-            return JsonResponse({
+            return json_response({
                 'success': False,
                 'error': 'Only image files (PNG, JPG, GIF, WebP) are supported'
             }, status=400)
@@ -1052,7 +1224,7 @@ def upload_answer_sheet(request):
         # Validate file size (max 10MB for vision API)
         max_size = 10 * 1024 * 1024
         if uploaded_file.size > max_size:
-            return JsonResponse({
+            return json_response({
                 'success': False,
                 'error': 'File too large. Maximum size is 10MB.'
             }, status=400)
@@ -1064,7 +1236,7 @@ def upload_answer_sheet(request):
             answer_sheet_file=uploaded_file,
         )
         
-        return JsonResponse({
+        return json_response({
             'success': True,
             'evaluation': {
                 'id': str(evaluation.id),
@@ -1074,7 +1246,7 @@ def upload_answer_sheet(request):
         })
         
     except Exception as e:
-        return JsonResponse({
+        return json_response({
             'success': False,
             'error': str(e)
         }, status=500)
@@ -1082,16 +1254,18 @@ def upload_answer_sheet(request):
 
 @login_required
 @require_http_methods(["POST"])
+# The body may carry the reference document's extracted text
+@max_json_body_size(settings.MAX_UPLOAD_SIZE)
 def evaluate_answer_sheet(request):
     """Run AI evaluation on an uploaded answer sheet"""
     try:
-        data = json.loads(request.body)
+        data = orjson.loads(request.body)
         evaluation_id = data.get('evaluation_id')
         difficulty = int(data.get('difficulty', 5))
         reference_content = data.get('reference_content')  # Direct content from uploaded file
         
         if not evaluation_id:
-            return JsonResponse({
+            return json_response({
                 'success': False,
                 'error': 'Evaluation ID required'
             }, status=400)
@@ -1100,28 +1274,27 @@ def evaluate_answer_sheet(request):
         evaluation = get_object_or_404(AnswerSheetEvaluation, id=evaluation_id, user=request.user)
         
         if evaluation.is_evaluated:
-            return JsonResponse({
+            return json_response({
                 'success': False,
                 'error': 'This answer sheet has already been evaluated'
             }, status=400)
         
         # Check that file exists
         if not evaluation.answer_sheet_file:
-            return JsonResponse({
+            return json_response({
                 'success': False,
                 'error': 'No answer sheet file found. Please re-upload.'
             }, status=400)
         
         # Check API key
         if not settings.GEMINI_API_KEY:
-            return JsonResponse({
+            return json_response({
                 'success': False,
                 'error': 'AI features not configured. Please set GEMINI_API_KEY.'
             }, status=500)
         
-        # Update difficulty
+        # Saved with the results below
         evaluation.difficulty = max(1, min(10, difficulty))
-        evaluation.save()
         
         # Run evaluation with Gemini Vision
         try:
@@ -1136,20 +1309,19 @@ def evaluate_answer_sheet(request):
             )
             evaluation_time = time.time() - start_time
         except ValueError as e:
-            return JsonResponse({
+            return json_response({
                 'success': False,
                 'error': str(e)
             }, status=500)
         except Exception as e:
-            import traceback
-            print(traceback.format_exc())
-            return JsonResponse({
+            logger.exception('Answer sheet evaluation failed')
+            return json_response({
                 'success': False,
                 'error': f'Evaluation failed: {str(e)}'
             }, status=500)
         
         if not result.get('success'):
-            return JsonResponse({
+            return json_response({
                 'success': False,
                 'error': result.get('error', 'Failed to evaluate answer sheet')
             }, status=500)
@@ -1165,11 +1337,14 @@ def evaluate_answer_sheet(request):
         # Calculate and save XP
         xp_earned = evaluation.calculate_xp()
         evaluation.xp_earned = xp_earned
-        evaluation.save()
-        
-        # Create evaluated questions
-        for q_data in result.get('questions', []):
-            EvaluatedQuestion.objects.create(
+        evaluation.save(update_fields=[
+            'difficulty', 'overall_score', 'question_count', 'general_feedback',
+            'model_used', 'evaluation_time', 'is_evaluated', 'xp_earned',
+        ])
+        
+        # Create evaluated questions in one INSERT
+        EvaluatedQuestion.objects.bulk_create([
+            EvaluatedQuestion(
                 evaluation=evaluation,
                 question_text=q_data['question_text'],
                 student_answer=q_data['student_answer'],
@@ -1178,14 +1353,13 @@ def evaluate_answer_sheet(request):
                 feedback=q_data['feedback'],
                 order=q_data.get('order', 0),
             )
+            for q_data in result.get('questions', [])
+        ])
         
         # Update user profile
-        profile = request.user.profile
-        profile.add_xp(xp_earned)
-        profile.update_streak()
-        profile.save()
+        UserProfile.record_activity(request.user, xp=xp_earned)
         
-        return JsonResponse({
+        return json_response({
             'success': True,
             'result': {
                 'evaluation_id': str(evaluation.id),
@@ -1196,12 +1370,12 @@ def evaluate_answer_sheet(request):
         })
         
     except json.JSONDecodeError:
-        return JsonResponse({
+        return json_response({
             'success': False,
             'error': 'Invalid JSON data'
         }, status=400)
     except Exception as e:
-        return JsonResponse({
+        return json_response({
             'success': False,
             'error': str(e)
         }, status=500)
@@ -1227,10 +1401,33 @@ def view_evaluation(request, evaluation_id):
 
 # ========== Podcast Views ==========
 
+# Dialogue lines sent to edge-tts at once
+PODCAST_TTS_CONCURRENCY = 8
+
+# One script line: an optional 'ALEX:' / 'SAM:' speaker tag, then the text
+_SCRIPT_LINE_RE = re.compile(r'^[^\S\n]*(?:(ALEX|SAM):)?[^\S\n]*(.*?)[^\S\n]*$', re.MULTILINE)
+
+
+def _parse_podcast_script(script):
+    """
+    Split a podcast script into (speaker, text) pairs in one regex pass.
+    
+    Speaker is 'alex' or 'sam' for tagged lines and 'narrator' otherwise;
+    blank lines are skipped.
+    """
+    return [
+        ((speaker or 'narrator').lower(), text)
+        for speaker, text in _SCRIPT_LINE_RE.findall(script)
+        if speaker or text
+    ]
+
+
 @login_required
 def podcasts(request):
     """Podcast hub - select documents and generate AI podcasts"""
-    documents = Document.objects.filter(user=request.user).order_by('-created_at')[:10]
+    documents = Document.objects.filter(user=request.user).only(
+        *DOCUMENT_LIST_FIELDS
+    ).order_by('-created_at')[:10]
     recent_podcasts = Podcast.objects.filter(user=request.user).order_by('-created_at')[:5]
     
     context = {
@@ -1245,12 +1442,12 @@ def podcasts(request):
 def generate_podcast(request):
     """Generate a podcast from a document via AJAX"""
     try:
-        data = json.loads(request.body)
+        data = orjson.loads(request.body)
         document_id = data.get('document_id')
         level = data.get('level', 'beginner')
         
         if not document_id:
-            return JsonResponse({
+            return json_response({
                 'success': False,
                 'error': 'Document ID required'
             }, status=400)
@@ -1258,26 +1455,27 @@ def generate_podcast(request):
         if level not in ('beginner', 'intermediate', 'advanced'):
             level = 'beginner'
         
-        # Get document
-        document = get_object_or_404(Document, id=document_id, user=request.user)
+        # Get document with only the part of its text that will be used
+        document = get_object_or_404(
+            Document.objects.defer('extracted_text').annotate(
+                **Document.context_annotations(settings.GENERATION_CONTEXT_TOKENS)
+            ),
+            id=document_id,
+            user=request.user,
+        )
         
         # Check if API key is configured
         if not settings.GEMINI_API_KEY:
-            return JsonResponse({
+            return json_response({
                 'success': False,
                 'error': 'AI features not configured. Please set GEMINI_API_KEY.'
             }, status=500)
         
-        # Get document content
-        context = document.extracted_text
-        
         # Limit context size
-        MAX_CONTEXT_CHARS = 10000
-        if len(context) > MAX_CONTEXT_CHARS:
-            context = context[:MAX_CONTEXT_CHARS] + "\n\n[... Content truncated for processing ...]"
+        context = document.clipped_context()
         
         if not context:
-            return JsonResponse({
+            return json_response({
                 'success': False,
                 'error': 'No content available for this document'
             }, status=400)
@@ -1288,20 +1486,19 @@ def generate_podcast(request):
             agent = get_agent('podcast')
             result = agent.generate_sync(context, level=level)
         except ValueError as e:
-            return JsonResponse({
+            return json_response({
                 'success': False,
                 'error': str(e)
             }, status=500)
         except Exception as e:
-            import traceback
-            print(traceback.format_exc())
-            return JsonResponse({
+            logger.exception('Podcast script generation failed')
+            return json_response({
                 'success': False,
                 'error': f'Script generation failed: {str(e)}'
             }, status=500)
         
         if not result.get('success'):
-            return JsonResponse({
+            return json_response({
                 'success': False,
                 'error': result.get('error', 'Failed to generate podcast script')
             }, status=500)
@@ -1312,20 +1509,16 @@ def generate_podcast(request):
         try:
             import edge_tts
             import asyncio
-            import tempfile
-            import os
             
             # Parse script into speaker segments
-            segments = []
-            for line in script.split('\n'):
-                line = line.strip()
-                if line.startswith('ALEX:'):
-                    segments.append(('alex', line[5:].strip()))
-                elif line.startswith('SAM:'):
-                    segments.append(('sam', line[4:].strip()))
+            segments = [
+                (speaker, text)
+                for speaker, text in _parse_podcast_script(script)
+                if speaker != 'narrator'
+            ]
             
             if not segments:
-                return JsonResponse({
+                return json_response({
                     'success': False,
                     'error': 'Failed to parse podcast script into dialogue segments'
                 }, status=500)
@@ -1337,32 +1530,28 @@ def generate_podcast(request):
             }
             
             async def generate_audio_segments():
-                """Generate audio for each segment and concatenate."""
-                audio_parts = []
+                """Generate audio for the segments concurrently and concatenate."""
+                semaphore = asyncio.Semaphore(PODCAST_TTS_CONCURRENCY)
                 
-                for speaker, text in segments:
-                    if not text:
-                        continue
+                async def synthesize(speaker, text):
                     voice = voices[speaker]
                     # Slightly slower rate for more natural conversational pacing
                     communicate = edge_tts.Communicate(
                         text, voice, rate='-5%', pitch='+0Hz'
                     )
                     
-                    # Create temp file for this segment
-                    temp_file = tempfile.NamedTemporaryFile(
-                        suffix='.mp3', delete=False
-                    )
-                    temp_path = temp_file.name
-                    temp_file.close()
-                    
-                    await communicate.save(temp_path)
-                    
-                    with open(temp_path, 'rb') as f:
-                        audio_parts.append(f.read())
-                    
-                    os.unlink(temp_path)
+                    # Collect the MP3 chunks in memory; no temp file needed
+                    audio = bytearray()
+                    async with semaphore:
+                        async for chunk in communicate.stream():
+                            if chunk['type'] == 'audio':
+                                audio.extend(chunk['data'])
+                    return audio
                 
+                # gather() keeps the script order
+                audio_parts = await asyncio.gather(*(
+                    synthesize(speaker, text) for speaker, text in segments if text
+                ))
                 return b''.join(audio_parts)
             
             # Run async TTS generation
@@ -1394,12 +1583,12 @@ def generate_podcast(request):
             )
             
             # Estimate duration (rough: ~150 words per minute for TTS)
-            word_count = result.get('word_count', len(script.split()))
+            word_count = result.get('word_count') or agent.count_words(script)
             estimated_duration = int(word_count / 150 * 60)
             podcast.duration_seconds = estimated_duration
             podcast.save(update_fields=['duration_seconds'])
             
-            return JsonResponse({
+            return json_response({
                 'success': True,
                 'podcast': {
                     'id': str(podcast.id),
@@ -1415,25 +1604,24 @@ def generate_podcast(request):
             })
             
         except ImportError:
-            return JsonResponse({
+            return json_response({
                 'success': False,
                 'error': 'edge-tts is not installed. Run: pip install edge-tts'
             }, status=500)
         except Exception as e:
-            import traceback
-            print(traceback.format_exc())
-            return JsonResponse({
+            logger.exception('Podcast audio generation failed')
+            return json_response({
                 'success': False,
                 'error': f'Audio generation failed: {str(e)}'
             }, status=500)
         
     except json.JSONDecodeError:
-        return JsonResponse({
+        return json_response({
             'success': False,
             'error': 'Invalid JSON data'
         }, status=400)
     except Exception as e:
-        return JsonResponse({
+        return json_response({
             'success': False,
             'error': str(e)
         }, status=500)
@@ -1465,18 +1653,10 @@ def view_podcast(request, podcast_id):
     podcast = get_object_or_404(Podcast, id=podcast_id, user=request.user)
     
     # Parse script into structured lines for the template
-    script_lines = []
-    if podcast.script:
-        for line in podcast.script.split('\n'):
-            line = line.strip()
-            if not line:
-                continue
-            if line.startswith('ALEX:'):
-                script_lines.append({'speaker': 'alex', 'text': line[5:].strip()})
-            elif line.startswith('SAM:'):
-                script_lines.append({'speaker': 'sam', 'text': line[4:].strip()})
-            else:
-                script_lines.append({'speaker': 'narrator', 'text': line})
+    script_lines = [
+        {'speaker': speaker, 'text': text}
+        for speaker, text in _parse_podcast_script(podcast.script or '')
+    ]
     
     context = {
         'podcast': podcast,
@@ -1492,12 +1672,14 @@ def view_podcast(request, podcast_id):
 def chatbot(request):
     """Chatbot hub - main page with document selector and chat sessions."""
     # Get user's uploaded documents for the document selector dropdown
-    documents = Document.objects.filter(user=request.user).order_by('-created_at')
+    documents = Document.objects.filter(user=request.user).only(
+        *DOCUMENT_LIST_FIELDS
+    ).order_by('-created_at')
     
     # Get user's existing chat sessions for the sidebar
     chat_sessions = ChatSession.objects.filter(
         user=request.user
-    ).select_related('document').order_by('-updated_at')[:20]
+    ).select_related('document').defer('document__extracted_text').order_by('-updated_at')[:20]
     
     context = {
         'documents': documents,
@@ -1518,10 +1700,12 @@ def chatbot_session(request, session_id):
     session_messages = session.messages.all().order_by('created_at')
     
     # Get all user data for sidebar and document selector
-    documents = Document.objects.filter(user=request.user).order_by('-created_at')
+    documents = Document.objects.filter(user=request.user).only(
+        *DOCUMENT_LIST_FIELDS
+    ).order_by('-created_at')
     chat_sessions = ChatSession.objects.filter(
         user=request.user
-    ).select_related('document').order_by('-updated_at')[:20]
+    ).select_related('document').defer('document__extracted_text').order_by('-updated_at')[:20]
     
     context = {
         'documents': documents,
@@ -1537,21 +1721,23 @@ def chatbot_session(request, session_id):
 def create_chat_session(request):
     """Create a new chat session for a selected document via AJAX."""
     try:
-        data = json.loads(request.body)
+        data = orjson.loads(request.body)
         document_id = data.get('document_id')
         
         if not document_id:
-            return JsonResponse({
+            return json_response({
                 'success': False,
                 'error': 'Please select a document to chat with.'
             }, status=400)
         
         # Verify the document belongs to the current user
-        document = get_object_or_404(Document, id=document_id, user=request.user)
+        document = get_object_or_404(
+            Document.objects.defer('extracted_text'), id=document_id, user=request.user
+        )
         
         # Check that the document has extracted text to chat about
-        if not document.extracted_text:
-            return JsonResponse({
+        if not document.text_hash:
+            return json_response({
                 'success': False,
                 'error': 'This document has no extracted text. Please re-upload it.'
             }, status=400)
@@ -1563,7 +1749,7 @@ def create_chat_session(request):
             title=f"Chat: {document.title[:50]}",
         )
         
-        return JsonResponse({
+        return json_response({
             'success': True,
             'session': {
                 'id': str(session.id),
@@ -1573,12 +1759,12 @@ def create_chat_session(request):
         })
         
     except json.JSONDecodeError:
-        return JsonResponse({
+        return json_response({
             'success': False,
             'error': 'Invalid request data.'
         }, status=400)
     except Exception as e:
-        return JsonResponse({
+        return json_response({
             'success': False,
             'error': str(e)
         }, status=500)
@@ -1591,95 +1777,58 @@ def send_chat_message(request):
     Send a message in a chat session via AJAX.
     
     Flow:
-    1. Save the user's message
+    1. Read the chat history
     2. Retrieve relevant context from the document (via vector store or raw text)
-    3. Build chat history from previous messages
-    4. Call the ChatbotAgent to generate a response
-    5. Save the assistant's response
-    6. Return the response to the frontend
+    3. Call the ChatbotAgent to generate a response
+    4. Save the user's message and the response together
+    5. Return the response to the frontend
     """
     try:
-        data = json.loads(request.body)
+        data = orjson.loads(request.body)
         session_id = data.get('session_id')
         user_message = data.get('message', '').strip()
         
         # Validate inputs
         if not session_id:
-            return JsonResponse({
+            return json_response({
                 'success': False,
                 'error': 'Session ID is required.'
             }, status=400)
         
         if not user_message:
-            return JsonResponse({
+            return json_response({
                 'success': False,
                 'error': 'Message cannot be empty.'
             }, status=400)
         
-        # Get the chat session
-        session = get_object_or_404(ChatSession, id=session_id, user=request.user)
+        # Get the chat session with just the columns used below; the
+        # document text is loaded only if the index has to be built or the
+        # search comes back empty
+        session = get_object_or_404(
+            ChatSession.objects.select_related('document').only(
+                'id', 'title',
+                'document__id', 'document__is_indexed', 'document__chunk_count',
+            ),
+            id=session_id, user=request.user,
+        )
         document = session.document
         
         # Check if API key is configured
         if not settings.GEMINI_API_KEY:
-            return JsonResponse({
+            return json_response({
                 'success': False,
                 'error': 'AI features not configured. Please set GEMINI_API_KEY.'
             }, status=500)
         
-        # Step 1: Save the user's message
-        user_msg = ChatMessage.objects.create(
-            session=session,
-            role='user',
-            content=user_message,
+        # Step 1: Read the conversation so far
+        chat_history = list(
+            session.messages.order_by('created_at').values('role', 'content')
         )
         
         # Step 2: Retrieve relevant context from the document
-        # We use FAISS semantic search for accurate retrieval.
-        # If the document hasn't been indexed yet, index it now (lazy indexing).
-        context = ""
-        vector_service = VectorStoreService()
-        
-        # Lazy indexing: auto-index the document if it hasn't been indexed yet
-        if not vector_service.document_exists(document.vector_doc_id):
-            if document.extracted_text:
-                index_result = vector_service.add_document(
-                    document.vector_doc_id,
-                    document.extracted_text
-                )
-                if index_result['success']:
-                    document.is_indexed = True
-                    document.chunk_count = index_result['chunk_count']
-                    document.save(update_fields=['is_indexed', 'chunk_count'])
-        
-        # Now try semantic search (should work after indexing)
-        if vector_service.document_exists(document.vector_doc_id):
-            search_result = vector_service.search(
-                document.vector_doc_id,
-                user_message,
-                top_k=5
-            )
-            if search_result['success'] and search_result['chunks']:
-                context = "\n\n---\n\n".join(search_result['chunks'])
-        
-        # Ultimate fallback: use raw text if indexing failed or no results found
-        if not context:
-            raw_text = document.extracted_text
-            MAX_CONTEXT_CHARS = 8000
-            if len(raw_text) > MAX_CONTEXT_CHARS:
-                context = raw_text[:MAX_CONTEXT_CHARS] + "\n\n[... Document truncated ...]"
-            else:
-                context = raw_text
-
+        context = _retrieve_chat_context(document, user_message)
         
-        # Step 3: Build chat history from previous messages in this session
-        previous_messages = session.messages.exclude(
-            id=user_msg.id
-        ).order_by('created_at').values('role', 'content')
-        
-        chat_history = list(previous_messages)
-        
-        # Step 4: Call the ChatbotAgent
+        # Step 3: Call the ChatbotAgent with the history read in step 1
         try:
             agent = get_agent('chatbot')
             result = agent.generate_sync(
@@ -1688,58 +1837,223 @@ def send_chat_message(request):
                 chat_history=chat_history,
             )
         except Exception as e:
-            import traceback
-            print(traceback.format_exc())
-            return JsonResponse({
+            logger.exception('Chat response generation failed')
+            return json_response({
                 'success': False,
                 'error': f'AI generation failed: {str(e)}'
             }, status=500)
         
         if not result.get('success'):
-            return JsonResponse({
+            return json_response({
                 'success': False,
                 'error': result.get('error', 'Failed to generate response.')
             }, status=500)
         
-        # Step 5: Save the assistant's response
-        assistant_msg = ChatMessage.objects.create(
+        # Step 4: Save the exchange and return the response
+        return json_response(_save_chat_exchange(
+            session, chat_history, user_message,
+            result['response'], result.get('sources_used', False),
+        ))
+        
+    except json.JSONDecodeError:
+        return json_response({
+            'success': False,
+            'error': 'Invalid request data.'
+        }, status=400)
+    except Exception:
+        # Details go to the log, not the client
+        logger.exception('send_chat_message failed')
+        return json_response({
+            'success': False,
+            'error': 'Internal error'
+        }, status=500)
+
+
+def _retrieve_chat_context(document, user_message):
+    """
+    Find the document text to answer user_message from.
+    
+    Uses semantic search over the document's vector index, building the
+    index on first use, and falls back to the start of the raw text.
+    """
+    # We use FAISS semantic search for accurate retrieval.
+    # If the document hasn't been indexed yet, index it now (lazy indexing).
+    context = ""
+    vector_service = get_vector_store()
+    
+    # Lazy indexing: auto-index the document if it hasn't been indexed yet.
+    # is_indexed is trusted instead of checking the index files on disk; it
+    # is only committed once those files are complete (see below).
+    if not document.is_indexed:
+        if document.extracted_text:
+            index_result = vector_service.add_document(
+                document.vector_doc_id,
+                document.extracted_text
+            )
+            # Other workers load the index from disk, so the flag is only
+            # committed once the background write has finished
+            if index_result['success'] and vector_service.wait_for_write(document.vector_doc_id):
+                document.is_indexed = True
+                document.chunk_count = index_result['chunk_count']
+                document.save(update_fields=['is_indexed', 'chunk_count'])
+    
+    # Now try semantic search (should work after indexing)
+    if document.is_indexed:
+        search_result = vector_service.search(
+            document.vector_doc_id,
+            user_message,
+            top_k=5
+        )
+        if search_result['success'] and search_result['chunks']:
+            context = "\n\n---\n\n".join(search_result['chunks'])
+        elif not vector_service.document_exists(document.vector_doc_id):
+            # The index files are gone; rebuild them on the next message.
+            # The flag was set after a completed write and files are only
+            # replaced atomically, so a write still pending in any worker
+            # cannot get here
+            Document.objects.filter(id=document.id, is_indexed=True).update(is_indexed=False)
+    
+    # Ultimate fallback: use raw text if indexing failed or no results found
+    if not context:
+        MAX_CONTEXT_CHARS = 8000
+        context = document.get_truncated_context(
+            MAX_CONTEXT_CHARS, marker="[... Document truncated ...]"
+        )
+    
+    return context
+
+
+def _save_chat_exchange(session, chat_history, user_message, response, sources_used):
+    """
+    Save a user message and the assistant's reply, and update the session.
+    
+    Returns:
+        The payload send_chat_message responds with
+    """
+    # Saved in one transaction, and only once the response exists, so
+    # the model call holds no transaction open
+    with transaction.atomic():
+        # One INSERT for both; the UUID ids are generated up front, so
+        # bulk_create needs no RETURNING to know them
+        assistant_msg = ChatMessage(
+            id=uuid.uuid4(),
             session=session,
             role='assistant',
-            content=result['response'],
-            sources_used=result.get('sources_used', False),
+            content=response,
+            sources_used=sources_used,
         )
-        
-        # Update session metadata
-        session.message_count = session.messages.count()
+        ChatMessage.objects.bulk_create([
+            ChatMessage(session=session, role='user', content=user_message),
+            assistant_msg,
+        ])
+        
+        # Update session metadata in one UPDATE; F() keeps the count right
+        # if another message lands at the same time
+        updates = {
+            'message_count': F('message_count') + 2,
+            'updated_at': timezone.now(),
+        }
         
         # Auto-title the session from the first user message
-        if session.message_count <= 2 and session.title.startswith('Chat:'):
+        is_first_message = not chat_history
+        if is_first_message and session.title.startswith('Chat:'):
             # Use the first ~50 chars of the first question as the title
-            session.title = user_message[:50] + ('...' if len(user_message) > 50 else '')
-        
-        session.save()
-        
-        # Step 6: Return the response
-        return JsonResponse({
-            'success': True,
-            'response': {
-                'id': str(assistant_msg.id),
-                'content': assistant_msg.content,
-                'sources_used': assistant_msg.sources_used,
-                'session_title': session.title,
-            }
-        })
+            session.title = (
+                user_message[:50] + '...' if len(user_message) > 50 else user_message
+            )
+            # Checked again in SQL, so a concurrent first message or rename wins
+            updates['title'] = Case(
+                When(title__startswith='Chat:', then=Value(session.title)),
+                default=F('title'),
+            )
         
-    except json.JSONDecodeError:
-        return JsonResponse({
+        ChatSession.objects.filter(pk=session.pk).update(**updates)
+    
+    return {
+        'success': True,
+        'response': {
+            # orjson encodes the UUID directly
+            'id': assistant_msg.id,
+            'content': assistant_msg.content,
+            'sources_used': assistant_msg.sources_used,
+            'session_title': session.title,
+        }
+    }
+
+
+@login_required
+@require_http_methods(["POST"])
+def send_chat_message_stream(request):
+    """
+    Send a chat message and stream the reply as server-sent events.
+    
+    Takes the same body as send_chat_message. Each event is a JSON object:
+    {'delta': text} while the reply is being written, then the same payload
+    send_chat_message returns. The exchange is saved once the reply is
+    complete.
+    """
+    try:
+        data = orjson.loads(request.body)
+        session_id = data.get('session_id')
+        user_message = data.get('message', '').strip()
+    except (json.JSONDecodeError, AttributeError):
+        # AttributeError: a non-object body or a non-string message
+        return _sse_response([{'success': False, 'error': 'Invalid request data.'}])
+    
+    if not session_id:
+        return _sse_response([{'success': False, 'error': 'Session ID is required.'}])
+    
+    if not user_message:
+        return _sse_response([{'success': False, 'error': 'Message cannot be empty.'}])
+    
+    try:
+        session = get_object_or_404(
+            ChatSession.objects.select_related('document').only(
+                'id', 'title',
+                'document__id', 'document__is_indexed', 'document__chunk_count',
+            ),
+            id=session_id, user=request.user,
+        )
+    except (ValidationError, TypeError):
+        # Not a UUID
+        return _sse_response([{'success': False, 'error': 'Invalid session ID.'}])
+    
+    if not settings.GEMINI_API_KEY:
+        return _sse_response([{
             'success': False,
-            'error': 'Invalid request data.'
-        }, status=400)
+            'error': 'AI features not configured. Please set GEMINI_API_KEY.'
+        }])
+    
+    return _sse_response(_chat_events(session, user_message))
+
+
+def _chat_events(session, user_message):
+    """Yield the event payloads for send_chat_message_stream."""
+    chat_history = list(
+        session.messages.order_by('created_at').values('role', 'content')
+    )
+    context = _retrieve_chat_context(session.document, user_message)
+    
+    agent = get_agent('chatbot')
+    parts = []
+    try:
+        deltas = agent.generate_stream(
+            context, user_message=user_message, chat_history=chat_history
+        )
+        for delta in _coalesce_deltas(deltas):
+            parts.append(delta)
+            yield {'delta': delta}
     except Exception as e:
-        return JsonResponse({
-            'success': False,
-            'error': str(e)
-        }, status=500)
+        logger.exception('Chat response generation failed')
+        yield {'success': False, 'error': f'AI generation failed: {str(e)}'}
+        return
+    
+    # Saved only once the whole reply has arrived; a closed stream saves nothing
+    response = ''.join(parts)
+    yield _save_chat_exchange(
+        session, chat_history, user_message,
+        response, agent.detect_sources_used(context, response),
+    )
 
 
 @login_required
@@ -1747,12 +2061,18 @@ def send_chat_message(request):
 def delete_chat_session(request, session_id):
     """Delete a chat session and all its messages via AJAX."""
     try:
-        session = get_object_or_404(ChatSession, id=session_id, user=request.user)
-        session.delete()
+        # Filtered delete: no separate fetch of the session first
+        deleted, _ = ChatSession.objects.filter(id=session_id, user=request.user).delete()
+        if not deleted:
+            return json_response({
+                'success': False,
+                'error': 'Chat session not found'
+            }, status=404)
         
-        return JsonResponse({'success': True})
-    except Exception as e:
-        return JsonResponse({
+        return json_response({'success': True})
+    except Exception:
+        logger.exception('delete_chat_session failed')
+        return json_response({
             'success': False,
-            'error': str(e)
+            'error': 'Internal error'
         }, status=500)
@@ -114,3 +114,62 @@ function addRippleEffect(button) {
 
 // Add ripple to all primary buttons
 document.querySelectorAll('.btn-primary').forEach(addRippleEffect);
+
+/**
+ * Poll a background job status URL until the job finishes, backing off
+ * between polls and giving up after POLL_TIMEOUT_MS.
+ * statusUrlTemplate holds the zero UUID in place of the job id.
+ */
+const POLL_TIMEOUT_MS = 10 * 60 * 1000;
+
+async function pollJob(statusUrlTemplate, jobId) {
+    const statusUrl = statusUrlTemplate.replace('00000000-0000-0000-0000-000000000000', jobId);
+    const deadline = Date.now() + POLL_TIMEOUT_MS;
+    let delay = 1000;
+
+    while (Date.now() < deadline) {
+        await new Promise(resolve => setTimeout(resolve, delay));
+        delay = Math.min(delay * 1.5, 10000);
+        const response = await fetch(statusUrl);
+        const result = await response.json();
+        if (!result.success || result.status === 'success') {
+            return result;
+        }
+    }
+    return { success: false, error: 'This is taking longer than expected. Please try again.' };
+}
+
+/**
+ * POST a JSON body to a server-sent events endpoint.
+ * Calls onDelta with the text of each {delta} event and resolves with the
+ * first event that is not a delta (EventSource can only send GET).
+ */
+async function postEventStream(url, body, csrfToken, onDelta) {
+    const response = await fetch(url, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json', 'X-CSRFToken': csrfToken },
+        body: JSON.stringify(body),
+    });
+    if (!response.ok) throw new Error(`HTTP ${response.status}`);
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+
+    while (true) {
+        const { done, value } = await reader.read();
+        if (done) throw new Error('Connection lost');
+        buffer += decoder.decode(value, { stream: true });
+
+        let end;
+        while ((end = buffer.indexOf('\n\n')) !== -1) {
+            const frame = buffer.slice(0, end);
+            buffer = buffer.slice(end + 2);
+            if (!frame.startsWith('data: ')) continue;
+
+            const data = JSON.parse(frame.slice(6));
+            if (data.delta === undefined) return data;
+            onDelta(data.delta);
+        }
+    }
+}